@@ -1,17 +1,58 @@
+import itertools
+import os
 import sqlite3
+import sys
+import tempfile
+import time
+
+from db_pool import get_pool
+
+# Savepoint names only need to be unique among the open blocks
+_savepoint_ids = itertools.count()
 
 class DatabaseConnection:
-    def __init__(self, db_name='users.db'):
+    """
+    Borrow a pooled connection for the with-block, as one transaction scope.
+
+    Connections come from the shared pool for db_name, so no connection is
+    opened per block. The pool hands a thread the connection it already
+    holds, so nested blocks on the same thread share one connection. Each
+    block is a SAVEPOINT: the outermost one opens the transaction and
+    commits it on a clean exit; an inner block that raises rolls back only
+    its own changes. Pass pool= to use a specific ConnectionPool.
+    """
+
+    def __init__(self, db_name='users.db', profile=None, pool=None):
         self.db_name = db_name
+        self.profile = profile
+        self.pool = pool
         self.conn = None
+        self._savepoint = None
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_name)
+        if self.pool is None:
+            # isolation_level=None: transactions are driven by the savepoints
+            self.pool = get_pool(self.db_name, profile=self.profile, isolation_level=None)
+        self.conn = self.pool.acquire()
+        self._savepoint = f"scope_{next(_savepoint_ids)}"
+        try:
+            self.conn.execute(f"SAVEPOINT {self._savepoint}")
+        except BaseException:
+            self.pool.release(self.conn)
+            raise
         return self.conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.conn:
-            self.conn.close()
+            try:
+                # Skip if the body already committed or rolled back itself
+                if self.conn.in_transaction:
+                    if exc_type is not None:
+                        self.conn.execute(f"ROLLBACK TO {self._savepoint}")
+                    self.conn.execute(f"RELEASE {self._savepoint}")
+            finally:
+                self.pool.release(self.conn)
+                self.conn = None
 
 # Usage example
 with DatabaseConnection() as conn:
@@ -19,3 +60,42 @@ with DatabaseConnection() as conn:
     cursor.execute("SELECT * FROM users")
     results = cursor.fetchall()
     print(results)
+
+# Time `scopes` with-blocks opening a new connection each time against
+# pooled, nested DatabaseConnection blocks (three levels deep)
+def benchmark(scopes=10000):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         [(f"user{i}", f"user{i}@example.com") for i in range(1000)])
+        conn.commit()
+        conn.close()
+
+        def connect_per_block(user_id):
+            conn = sqlite3.connect(database)
+            try:
+                conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            finally:
+                conn.close()
+
+        def pooled(user_id):
+            with DatabaseConnection(database) as conn:
+                conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+        def nested(user_id):
+            with DatabaseConnection(database):
+                with DatabaseConnection(database):
+                    pooled(user_id)
+
+        for label, scope in (('connect per block', connect_per_block), ('pooled', pooled),
+                             ('pooled, 3 nested', nested)):
+            start = time.perf_counter()
+            for i in range(scopes):
+                scope(i % 1000 + 1)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>18}: {elapsed / scopes * 1e6:7.1f}us per outer block")
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
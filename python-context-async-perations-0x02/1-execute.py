@@ -1,19 +1,100 @@
-import sqlite3
+import keyword
+import sys
+import time
+import tracemalloc
+from functools import lru_cache
+
+from db_profile import connect
+
+# Build (and reuse) a lightweight row class for a tuple of column names.
+# Instances use __slots__, so they cost about as much memory as a tuple but
+# allow row.name access. Columns that aren't valid, unique identifiers
+# become col<i>, with underscores appended while that name is taken by
+# another column.
+@lru_cache(maxsize=256)
+def row_class(columns):
+    fields = [name if name.isidentifier() and not keyword.iskeyword(name)
+              and not name.startswith('_') else None for name in columns]
+    taken = set()
+    for i, name in enumerate(fields):
+        if name in taken:
+            fields[i] = None
+        taken.add(name)
+    for i, name in enumerate(fields):
+        if name is None:
+            name = f"col{i}"
+            while name in taken:
+                name += '_'
+            fields[i] = name
+            taken.add(name)
+    fields = tuple(fields)
+
+    # Generated like namedtuple's __new__: plain attribute stores are several
+    # times faster than a setattr loop on the hot path
+    namespace = {}
+    exec(f"def __init__(_row, {', '.join(fields)}):\n"
+         + ''.join(f"    _row.{field} = {field}\n" for field in fields), namespace)
+    __init__ = namespace['__init__']
+
+    def __iter__(self):
+        return (getattr(self, field) for field in fields)
+
+    def __repr__(self):
+        values = ', '.join(f"{field}={getattr(self, field)!r}" for field in fields)
+        return f"Row({values})"
+
+    return type('Row', (), {'__slots__': fields, '__init__': __init__,
+                            '__iter__': __iter__, '__repr__': __repr__})
 
 class ExecuteQuery:
-    def __init__(self, query, params=None, db_name='users.db'):
+    """
+    Run a query and hand its rows to the with-block.
+
+    By default __enter__ fetches every row and returns the list. With
+    stream=True it returns an iterator that pulls chunk_size rows at a time
+    with fetchmany, so memory stays bounded by the chunk however large the
+    result; the cursor stays open until __exit__. row_type=True turns rows
+    into __slots__ objects named after the columns (row_type may also be
+    any callable taking the column values).
+    """
+
+    def __init__(self, query, params=None, db_name='users.db', profile=None,
+                 stream=False, chunk_size=1000, row_type=None):
         self.query = query
         self.params = params or ()
         self.db_name = db_name
+        self.profile = profile
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.row_type = row_type
         self.conn = None
         self.cursor = None
         self.results = None
 
+    def _row_factory(self):
+        if self.row_type is True:
+            return row_class(tuple(column[0] for column in self.cursor.description))
+        return self.row_type
+
+    def _iter_rows(self):
+        make_row = self._row_factory()
+        while True:
+            rows = self.cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            if make_row is None:
+                yield from rows
+            else:
+                for row in rows:
+                    yield make_row(*row)
+
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_name)
+        self.conn = connect(self.db_name, self.profile)
         self.cursor = self.conn.cursor()
         self.cursor.execute(self.query, self.params)
-        self.results = self.cursor.fetchall()
+        if self.stream:
+            return self._iter_rows()
+        self.results = list(self._iter_rows()) if self.row_type else self.cursor.fetchall()
         return self.results
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -28,3 +109,26 @@ params = (25,)
 
 with ExecuteQuery(query, params) as results:
     print(results)
+
+# Peak Python memory while iterating a generated result of `rows` rows,
+# fetched all at once and streamed in chunks
+def benchmark(rows=10_000_000, chunk_size=1000, fetchall_rows=1_000_000):
+    query = ("WITH RECURSIVE n(id) AS (SELECT 1 UNION ALL SELECT id + 1 FROM n LIMIT ?) "
+             "SELECT id, 'user' || id AS name, id % 90 AS age FROM n")
+    runs = (
+        ('fetchall', fetchall_rows, {}),
+        ('stream', rows, {'stream': True, 'chunk_size': chunk_size}),
+        ('stream, slots rows', rows, {'stream': True, 'chunk_size': chunk_size, 'row_type': True}),
+    )
+    for label, count, options in runs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ExecuteQuery(query, (count,), db_name=':memory:', **options) as result:
+            total = sum(1 for _ in result)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:>18}: {total:>10,} rows in {elapsed:6.2f}s, peak {peak / 2**20:8.1f} MiB")
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,27 +1,250 @@
 import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
 import aiosqlite
+from collections import deque
+from contextlib import asynccontextmanager
+
+from db_profile import pragma_statements
 
 DB_NAME = 'users.db'
 
-async def async_fetch_users():
-    async with aiosqlite.connect(DB_NAME) as db:
+# Open an aiosqlite connection with a named db_profile's PRAGMAs applied
+@asynccontextmanager
+async def connect(db_name=DB_NAME, profile=None):
+    async with aiosqlite.connect(db_name) as db:
+        for statement in pragma_statements(profile):
+            await db.execute(statement)
+        yield db
+
+class AsyncConnectionPool:
+    """
+    Pool of at most `size` aiosqlite connections to one database.
+
+    Connections are opened on demand and reused most-recently-used first;
+    when all are busy, connection() waits up to `timeout` seconds for one
+    to be returned. Every aiosqlite connection runs on its own thread, so
+    the size also caps the threads and file handles a fan-out can use.
+    Create and use a pool inside one event loop:
+
+        async with AsyncConnectionPool(size=8) as pool:
+            async with pool.connection() as db:
+                ...
+    """
+
+    def __init__(self, db_name=DB_NAME, size=8, profile=None, timeout=30.0):
+        if size < 1:
+            raise ValueError("size must be at least 1.")
+        self.db_name = db_name
+        self.size = size
+        self.profile = profile
+        self.timeout = timeout
+        self._idle = []
+        self._waiters = deque()
+        self._closing = set()
+        self._opened = 0
+        self._closed = False
+
+    async def _open(self):
+        db = await aiosqlite.connect(self.db_name)
+        try:
+            for statement in pragma_statements(self.profile):
+                await db.execute(statement)
+        except BaseException:
+            await db.close()
+            raise
+        return db
+
+    def _wake_one(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    # The pool state is only touched between awaits, so the event loop
+    # serializes it without a lock. Waiting uses asyncio.wait rather than
+    # wait_for, which can swallow a cancellation that races with a wakeup.
+    async def _acquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Pool is closed.")
+            if self._idle:
+                return self._idle.pop()
+            if self._opened < self.size:
+                self._opened += 1
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(
+                    f"No connection to {self.db_name} free after {timeout}s.")
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait([waiter], timeout=remaining)
+            except BaseException:
+                # Pass on a wakeup that arrived as this waiter was cancelled
+                if waiter.done():
+                    self._wake_one()
+                raise
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+        try:
+            return await self._open()
+        except BaseException:
+            self._opened -= 1
+            self._wake_one()
+            raise
+
+    async def _release(self, db, reusable=True):
+        if not reusable:
+            # Stop the statement the cancelled body left running, so the
+            # close below doesn't have to wait for it to finish
+            await db.interrupt()
+        reusable = reusable and not self._closed
+        if reusable and db.in_transaction:
+            try:
+                await db.rollback()
+            except sqlite3.Error:
+                reusable = False
+        if reusable:
+            self._idle.append(db)
+            self._wake_one()
+            return
+        self._opened -= 1
+        self._wake_one()
+        if self._closed:
+            await db.close()
+            return
+        # Closing still waits for statements queued on the connection's
+        # thread, so do it in the background instead of holding up the
+        # caller; close() waits for these tasks
+        task = asyncio.ensure_future(db.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        """Borrow a connection; waits at most timeout (default self.timeout) seconds."""
+        db = await self._acquire(self.timeout if timeout is None else timeout)
+        reusable = True
+        try:
+            yield db
+        except asyncio.CancelledError:
+            reusable = False
+            raise
+        finally:
+            # A cancelled body (e.g. a query timeout) may leave its statement
+            # running, so it is interrupted and the connection retired.
+            # Shielded so a cancelled caller still hands its connection back.
+            await asyncio.shield(self._release(db, reusable))
+
+    async def close(self):
+        """Close idle connections; borrowed ones are closed when returned."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        self._opened -= len(idle)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+        for db in idle:
+            await db.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+# Run many queries against a pool, at most `limit` at a time (default: the
+# pool size). Each query is SQL text or a (sql, params) pair; results come
+# back in the same order. A query taking longer than `timeout` seconds is
+# cancelled with asyncio.TimeoutError. Unless return_exceptions is set, the
+# first failure cancels every query still waiting or running and is raised.
+async def run_queries(pool, queries, limit=None, timeout=None, return_exceptions=False):
+    semaphore = asyncio.Semaphore(limit or pool.size)
+
+    async def fetch(sql, params):
+        async with pool.connection() as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    async def run(query):
+        sql, params = (query, ()) if isinstance(query, str) else query
+        async with semaphore:
+            return await asyncio.wait_for(fetch(sql, params), timeout)
+
+    tasks = [asyncio.ensure_future(run(query)) for query in queries]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def async_fetch_users(pool=None):
+    async with (pool.connection() if pool else connect()) as db:
         async with db.execute("SELECT * FROM users") as cursor:
             results = await cursor.fetchall()
             print("All Users:", results)
             return results
 
-async def async_fetch_older_users():
-    async with aiosqlite.connect(DB_NAME) as db:
+async def async_fetch_older_users(pool=None):
+    async with (pool.connection() if pool else connect()) as db:
         async with db.execute("SELECT * FROM users WHERE age > 40") as cursor:
             results = await cursor.fetchall()
             print("Users older than 40:", results)
             return results
 
 async def fetch_concurrently():
-    await asyncio.gather(
-        async_fetch_users(),
-        async_fetch_older_users()
-    )
+    async with AsyncConnectionPool(size=2) as pool:
+        await asyncio.gather(
+            async_fetch_users(pool),
+            async_fetch_older_users(pool)
+        )
+
+# Queries/sec for `n` concurrent point lookups: a connection per query
+# under an unbounded gather (the pattern above) against run_queries on a
+# pool of `pool_size`
+async def benchmark(levels=(10, 100, 1000), pool_size=8):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+        conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                         [(f"user{i}", f"user{i}@example.com", i % 90) for i in range(1000)])
+        conn.commit()
+        conn.close()
+        sql = "SELECT * FROM users WHERE id = ?"
+
+        async def connect_per_query(user_id):
+            async with connect(database) as db:
+                async with db.execute(sql, (user_id,)) as cursor:
+                    return await cursor.fetchall()
+
+        for n in levels:
+            start = time.perf_counter()
+            await asyncio.gather(*(connect_per_query(i % 1000 + 1) for i in range(n)))
+            unbounded = n / (time.perf_counter() - start)
+
+            async with AsyncConnectionPool(database, size=pool_size) as pool:
+                start = time.perf_counter()
+                await run_queries(pool, [(sql, (i % 1000 + 1,)) for i in range(n)])
+                pooled = n / (time.perf_counter() - start)
+
+            print(f"{n:>5} queries: {unbounded:>8,.0f}/sec connect per query, "
+                  f"{pooled:>8,.0f}/sec pooled ({pool_size} connections)")
 
 if __name__ == "__main__":
     asyncio.run(fetch_concurrently())
+    if sys.argv[1:] == ['benchmark']:
+        asyncio.run(benchmark())
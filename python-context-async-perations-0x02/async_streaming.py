@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Async generator versions of the 3-concurrent fetchers and of the
+python-generators-0x00 streaming helpers, all built on stream_batches().
+
+Rows are read batch_size at a time with fetchmany, and the next batch is
+only read when the consumer asks for it: a slow `async for` body holds the
+reader back (backpressure) and memory stays bounded by one batch however
+large the table. The consumer can start on the first rows as soon as they
+arrive instead of waiting for fetchall().
+
+    async with AsyncConnectionPool(size=4) as pool:
+        async for user in stream_users(pool):
+            ...
+
+Every function takes an optional `source`: an AsyncConnectionPool, an open
+aiosqlite connection, or None to open a connection for the scan. A
+generator holds its connection until it is exhausted or closed, so close
+one you stop early (await gen.aclose(), or contextlib.aclosing).
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+
+fetchers = __import__('3-concurrent')
+AsyncConnectionPool = fetchers.AsyncConnectionPool
+
+KEYSET_COLUMNS = ("id",)
+
+
+@asynccontextmanager
+async def _connection(source):
+    """Yield a connection from a pool, an open connection, or a new one."""
+    if source is None:
+        async with fetchers.connect() as db:
+            yield db
+    elif isinstance(source, AsyncConnectionPool):
+        async with source.connection() as db:
+            yield db
+    else:
+        yield source
+
+
+async def stream_batches(query, params=(), batch_size=1000, source=None, as_dict=False):
+    """
+    Async generator yielding lists of up to batch_size rows of a query.
+
+    Rows are tuples, or dicts keyed by column name with as_dict=True.
+    """
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+    async with _connection(source) as db:
+        async with db.execute(query, params) as cursor:
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if as_dict:
+                    rows = [dict(zip(columns, row)) for row in rows]
+                yield rows
+
+
+async def stream_rows(query, params=(), batch_size=1000, source=None, as_dict=False):
+    """Async generator yielding the rows of a query one at a time."""
+    batches = stream_batches(query, params, batch_size, source, as_dict)
+    try:
+        async for rows in batches:
+            for row in rows:
+                yield row
+    finally:
+        # Close the inner generator now, not when it is garbage collected,
+        # so an early exit hands the connection straight back
+        await batches.aclose()
+
+
+# --- Streaming versions of the 3-concurrent fetchers ---
+def async_stream_users(source=None, batch_size=1000):
+    """Rows of SELECT * FROM users, as async_fetch_users returns them."""
+    return stream_rows("SELECT * FROM users", (), batch_size, source)
+
+
+def async_stream_older_users(source=None, age=40, batch_size=1000):
+    """Rows of users older than `age`, as async_fetch_older_users returns them."""
+    return stream_rows("SELECT * FROM users WHERE age > ?", (age,), batch_size, source)
+
+
+# --- Ports of the python-generators-0x00 helpers ---
+def stream_users(source=None, prefetch=1000):
+    """Yield one user at a time as a dictionary (0-stream_users)."""
+    return stream_rows("SELECT * FROM users", (), prefetch, source, as_dict=True)
+
+
+def stream_users_in_batches(batch_size, source=None):
+    """Yield lists of up to batch_size user dicts (1-batch_processing)."""
+    return stream_batches("SELECT * FROM users", (), batch_size, source, as_dict=True)
+
+
+async def batch_processing(batch_size, source=None):
+    """Yield the users over 25, reading them in batches (1-batch_processing)."""
+    batches = stream_users_in_batches(batch_size, source)
+    try:
+        async for batch in batches:
+            for user in batch:
+                if user['age'] > 25:
+                    yield user
+    finally:
+        await batches.aclose()
+
+
+async def _fetch_page(query, params, source):
+    async with _connection(source) as db:
+        async with db.execute(query, params) as cursor:
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+
+async def paginate_users(page_size, offset, source=None):
+    """Fetch one LIMIT/OFFSET page of user dicts (2-lazy_paginate)."""
+    return await _fetch_page("SELECT * FROM users LIMIT ? OFFSET ?", (page_size, offset), source)
+
+
+async def paginate_users_after(page_size, after=None, key="id", source=None):
+    """Fetch the keyset page of user dicts ordered by `key` after `after`."""
+    if key not in KEYSET_COLUMNS:
+        raise ValueError(f"key must be one of {KEYSET_COLUMNS}.")
+    where = f"WHERE {key} > ? " if after is not None else ""
+    params = ((after,) if after is not None else ()) + (page_size,)
+    return await _fetch_page(f"SELECT * FROM users {where}ORDER BY {key} LIMIT ?", params, source)
+
+
+async def lazy_paginate(page_size, key=None, source=None):
+    """
+    Async generator of pages of user dicts (2-lazy_paginate).
+
+    Pages use LIMIT/OFFSET, or keyset pagination on `key` so every page
+    costs the same however deep the scan is. A page is only fetched when
+    the consumer asks for it.
+    """
+    position = 0 if key is None else None
+    while True:
+        if key is None:
+            page = await paginate_users(page_size, position, source)
+            position += page_size
+        else:
+            page = await paginate_users_after(page_size, position, key, source)
+            position = page[-1][key] if page else position
+        if not page:
+            break
+        yield page
+        # A short page is the last one; don't ask for another
+        if len(page) < page_size:
+            break
+
+
+async def stream_user_ages(source=None, chunk_size=1000):
+    """Yield user ages one by one (4-stream_ages)."""
+    batches = stream_batches("SELECT age FROM users", (), chunk_size, source)
+    try:
+        async for rows in batches:
+            for (age,) in rows:
+                yield age
+    finally:
+        await batches.aclose()
+
+
+async def calculate_average_age(source=None):
+    """Average age over the streamed ages in constant memory (4-stream_ages)."""
+    total = count = 0
+    async for age in stream_user_ages(source):
+        total += age
+        count += 1
+    if not count:
+        print("No users found.")
+        return None
+    average = total / count
+    print(f"Average age of users: {average:.2f}")
+    return average
+
+
+async def benchmark(rows=200000, batch_size=1000):
+    """
+    Compare fetchall() with streaming over a `rows`-row table: time to the
+    first row, total time and peak traced memory.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+        conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                         [(f"user{i}", f"user{i}@example.com", i % 90) for i in range(rows)])
+        conn.commit()
+        conn.close()
+
+        async def fetch_all(pool):
+            async with pool.connection() as db:
+                async with db.execute("SELECT * FROM users") as cursor:
+                    for row in await cursor.fetchall():
+                        yield row
+
+        async with AsyncConnectionPool(database, size=1) as pool:
+            for label, scan in (('fetchall', fetch_all(pool)),
+                                ('stream', async_stream_users(pool, batch_size))):
+                tracemalloc.start()
+                start = time.perf_counter()
+                first = None
+                count = 0
+                async for _ in scan:
+                    if first is None:
+                        first = time.perf_counter() - start
+                    count += 1
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{label:>8}: {count:,} rows, first row after {first * 1000:7.1f}ms, "
+                      f"total {elapsed:5.2f}s, peak {peak / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(*(int(arg) for arg in sys.argv[1:3])))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for async_streaming.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import aiosqlite
+
+from fixtures import create_users, import_script
+
+import_script('3-concurrent')
+import async_streaming  # noqa: E402  (needs 3-concurrent importable first)
+
+ENDLESS = ("WITH RECURSIVE n(id) AS (SELECT 1 UNION ALL SELECT id + 1 FROM n LIMIT ?) "
+           "SELECT id FROM n")
+
+
+class TestAsyncStreaming(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for the async generators in async_streaming.
+    """
+
+    def setUp(self) -> None:
+        """Create a database with ten users aged 20 to 29."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_users(self.database, rows=10)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def pool(self):
+        """A one-connection pool on the test database."""
+        return async_streaming.AsyncConnectionPool(self.database, size=1, timeout=1)
+
+    async def test_batches(self) -> None:
+        """Test batches hold at most batch_size rows, as dicts when asked."""
+        async with self.pool() as pool:
+            batches = [batch async for batch in async_streaming.stream_users_in_batches(4, pool)]
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        self.assertEqual(batches[0][0], {'id': 1, 'name': 'user0',
+                                         'email': 'user0@example.com', 'age': 20})
+
+    async def test_invalid_batch_size(self) -> None:
+        """Test a batch_size that isn't a positive integer raises ValueError."""
+        for batch_size in (0, -1, 2.5):
+            with self.assertRaises(ValueError):
+                await async_streaming.stream_batches("SELECT 1", batch_size=batch_size).__anext__()
+
+    async def test_stream_is_lazy(self) -> None:
+        """Test rows are read as the consumer asks, not all up front."""
+        async with aiosqlite.connect(':memory:') as db:
+            rows = async_streaming.stream_rows(ENDLESS, (10 ** 12,), batch_size=2, source=db)
+            self.assertEqual([await rows.__anext__() for _ in range(3)], [(1,), (2,), (3,)])
+            await rows.aclose()
+
+    async def test_early_close_returns_connection(self) -> None:
+        """Test closing a stream early hands its connection back to the pool."""
+        async with self.pool() as pool:
+            users = async_streaming.stream_users(pool, prefetch=2)
+            await users.__anext__()
+            await users.aclose()
+            async with pool.connection(timeout=0.5) as db:
+                async with db.execute("SELECT COUNT(*) FROM users") as cursor:
+                    self.assertEqual(await cursor.fetchone(), (10,))
+
+    async def test_batch_processing(self) -> None:
+        """Test only users over 25 come through."""
+        async with self.pool() as pool:
+            ages = [user['age'] async for user in async_streaming.batch_processing(3, pool)]
+        self.assertEqual(ages, list(range(26, 30)))
+
+    async def test_offset_and_keyset_pages_match(self) -> None:
+        """Test both pagination modes return the same pages and stop after a short one."""
+        async with self.pool() as pool:
+            by_offset = [page async for page in async_streaming.lazy_paginate(4, source=pool)]
+            by_key = [page async for page in async_streaming.lazy_paginate(4, 'id', pool)]
+        self.assertEqual([len(page) for page in by_offset], [4, 4, 2])
+        self.assertEqual(by_key, by_offset)
+
+    async def test_keyset_column_checked(self) -> None:
+        """Test keyset pagination only orders by allowed columns."""
+        with self.assertRaises(ValueError):
+            await async_streaming.paginate_users_after(4, key='age; DROP TABLE users')
+
+    async def test_calculate_average_age(self) -> None:
+        """Test the streamed average is printed and returned."""
+        async with self.pool() as pool:
+            with redirect_stdout(io.StringIO()) as out:
+                self.assertEqual(await async_streaming.calculate_average_age(pool), 24.5)
+        self.assertIn("24.50", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 3-concurrent.AsyncConnectionPool and
+run_queries.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from fixtures import create_users, import_script
+
+concurrent = import_script('3-concurrent')
+
+
+class TestAsyncConnectionPool(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for 3-concurrent.AsyncConnectionPool and run_queries.
+    """
+
+    def setUp(self) -> None:
+        """Create a database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_users(self.database)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    async def test_size_caps_open_connections(self) -> None:
+        """Test concurrent borrowers never hold more than `size` connections."""
+        async with concurrent.AsyncConnectionPool(self.database, size=2) as pool:
+            borrowed = set()
+            peak = 0
+
+            async def borrow():
+                nonlocal peak
+                async with pool.connection() as db:
+                    borrowed.add(db)
+                    peak = max(peak, len(borrowed))
+                    await asyncio.sleep(0.01)
+                    borrowed.discard(db)
+
+            await asyncio.gather(*(borrow() for _ in range(10)))
+            self.assertEqual(peak, 2)
+            self.assertLessEqual(pool._opened, 2)
+
+    async def test_acquire_times_out(self) -> None:
+        """Test a borrower gives up after the timeout when none is free."""
+        async with concurrent.AsyncConnectionPool(self.database, size=1) as pool:
+            async with pool.connection():
+                with self.assertRaises(asyncio.TimeoutError):
+                    async with pool.connection(timeout=0.05):
+                        pass
+            async with pool.connection(timeout=0.05) as db:
+                async with db.execute("SELECT COUNT(*) FROM users") as cursor:
+                    self.assertEqual(await cursor.fetchone(), (3,))
+
+    async def test_cancelled_body_retires_connection(self) -> None:
+        """Test a connection whose body was cancelled is not reused."""
+        async with concurrent.AsyncConnectionPool(self.database, size=1) as pool:
+            used = []
+
+            async def slow():
+                async with pool.connection() as db:
+                    used.append(db)
+                    await asyncio.sleep(10)
+
+            task = asyncio.ensure_future(slow())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            async with pool.connection(timeout=1) as db:
+                self.assertIsNot(db, used[0])
+
+    async def test_run_queries_keeps_order(self) -> None:
+        """Test run_queries returns results in query order."""
+        async with concurrent.AsyncConnectionPool(self.database, size=2) as pool:
+            queries = [("SELECT name FROM users WHERE id = ?", (i,)) for i in (3, 1, 2)]
+            results = await concurrent.run_queries(pool, queries)
+        self.assertEqual(results, [[('user2',)], [('user0',)], [('user1',)]])
+
+    async def test_run_queries_timeout(self) -> None:
+        """Test a query over its timeout raises and the pool stays usable."""
+        slow = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n "
+                "LIMIT 3000000) SELECT COUNT(*) FROM n")
+        async with concurrent.AsyncConnectionPool(self.database, size=1) as pool:
+            with self.assertRaises(asyncio.TimeoutError):
+                await concurrent.run_queries(pool, [slow], timeout=0.05)
+            results = await concurrent.run_queries(pool, ["SELECT COUNT(*) FROM users"],
+                                                   timeout=5)
+        self.assertEqual(results, [[(3,)]])
+
+    async def test_timeout_interrupts_statement(self) -> None:
+        """Test a timed-out statement is interrupted and close() waits for it."""
+        endless = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n "
+                   "LIMIT 1000000000) SELECT COUNT(*) FROM n")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pool = concurrent.AsyncConnectionPool(self.database, size=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await concurrent.run_queries(pool, [endless], timeout=0.05)
+        await pool.close()
+        self.assertLess(loop.time() - start, 5)
+        self.assertFalse(pool._closing)
+
+    async def test_connection_returned_after_close_is_closed(self) -> None:
+        """Test a connection borrowed across close() is closed when returned."""
+        pool = concurrent.AsyncConnectionPool(self.database, size=1)
+        async with pool.connection() as db:
+            await pool.close()
+        self.assertFalse(pool._closing)
+        with self.assertRaises(ValueError):
+            await db.execute("SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
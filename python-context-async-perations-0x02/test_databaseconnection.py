@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 0-databaseconnection.DatabaseConnection.
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import db_pool
+from fixtures import create_users, import_script
+
+databaseconnection = import_script('0-databaseconnection')
+
+
+class TestDatabaseConnection(unittest.TestCase):
+    """
+    Test class for 0-databaseconnection.DatabaseConnection.
+    """
+
+    def setUp(self) -> None:
+        """Create a database and a pool in autocommit mode for it."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_users(self.database)
+        self.pool = db_pool.ConnectionPool(self.database, isolation_level=None)
+
+    def tearDown(self) -> None:
+        """Close the pool and remove the database."""
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def scope(self):
+        """A DatabaseConnection using the test pool."""
+        return databaseconnection.DatabaseConnection(self.database, pool=self.pool)
+
+    def names(self) -> list:
+        """Committed user names, as a separate connection sees them."""
+        conn = sqlite3.connect(self.database)
+        try:
+            return [row[0] for row in conn.execute("SELECT name FROM users ORDER BY id")]
+        finally:
+            conn.close()
+
+    def test_outer_block_commits(self) -> None:
+        """Test a clean exit from the outermost block commits."""
+        with self.scope() as conn:
+            conn.execute("INSERT INTO users (name) VALUES ('new')")
+        self.assertEqual(self.names()[-1], 'new')
+
+    def test_inner_block_rolls_back_alone(self) -> None:
+        """Test a nested block that raises undoes only its own changes."""
+        with self.scope() as outer:
+            outer.execute("INSERT INTO users (name) VALUES ('kept')")
+            with self.assertRaises(ValueError):
+                with self.scope() as inner:
+                    self.assertIs(inner, outer)
+                    inner.execute("INSERT INTO users (name) VALUES ('lost')")
+                    raise ValueError("inner failure")
+        self.assertIn('kept', self.names())
+        self.assertNotIn('lost', self.names())
+
+    def test_outer_block_rolls_back(self) -> None:
+        """Test an exception in the outermost block discards everything."""
+        with self.assertRaises(ValueError):
+            with self.scope() as conn:
+                conn.execute("DELETE FROM users")
+                raise ValueError("outer failure")
+        self.assertEqual(len(self.names()), 3)
+
+    def test_default_pool_not_shared_with_other_options(self) -> None:
+        """Test the savepoint pool isn't one already made with other options."""
+        other = db_pool.get_pool(self.database)
+        self.addCleanup(db_pool.close_pools)
+        with databaseconnection.DatabaseConnection(self.database) as conn:
+            self.assertIsNone(conn.isolation_level)
+        self.assertIsNot(other, db_pool.get_pool(self.database, isolation_level=None))
+        self.assertIs(other, db_pool.get_pool(self.database, profile=db_pool.db_profile.DEFAULT_PROFILE))
+
+
+if __name__ == '__main__':
+    unittest.main()
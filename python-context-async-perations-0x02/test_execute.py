@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 1-execute.ExecuteQuery.
+"""
+
+import os
+import sqlite3
+import tempfile
+import types
+import unittest
+from itertools import islice
+
+from fixtures import create_users, import_script
+
+execute = import_script('1-execute')
+ExecuteQuery = execute.ExecuteQuery
+
+# More rows than could ever be fetched at once
+ENDLESS = ("WITH RECURSIVE n(id) AS (SELECT 1 UNION ALL SELECT id + 1 FROM n LIMIT ?) "
+           "SELECT id, 'user' || id AS name FROM n")
+
+
+class TestExecuteQuery(unittest.TestCase):
+    """
+    Test class for 1-execute.ExecuteQuery.
+    """
+
+    def setUp(self) -> None:
+        """Create a database with three users aged 20 to 22."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_users(self.database)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def test_fetchall_by_default(self) -> None:
+        """Test the with-block gets a list of tuples."""
+        with ExecuteQuery("SELECT name FROM users WHERE age > ?", (20,),
+                          db_name=self.database) as results:
+            self.assertEqual(results, [('user1',), ('user2',)])
+
+    def test_stream_is_lazy(self) -> None:
+        """Test stream=True pulls rows chunk by chunk instead of all at once."""
+        with ExecuteQuery(ENDLESS, (10 ** 12,), db_name=':memory:', stream=True,
+                          chunk_size=2) as rows:
+            self.assertIsInstance(rows, types.GeneratorType)
+            self.assertEqual(list(islice(rows, 3)), [(1, 'user1'), (2, 'user2'), (3, 'user3')])
+
+    def test_stream_covers_every_chunk(self) -> None:
+        """Test a streamed result crossing chunk boundaries is complete."""
+        with ExecuteQuery(ENDLESS, (7,), db_name=':memory:', stream=True,
+                          chunk_size=3) as rows:
+            self.assertEqual([row[0] for row in rows], list(range(1, 8)))
+
+    def test_exit_closes_connection(self) -> None:
+        """Test leaving the block early closes the cursor and the connection."""
+        query = ExecuteQuery(ENDLESS, (10 ** 12,), db_name=':memory:', stream=True)
+        with query as rows:
+            next(rows)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            query.conn.execute("SELECT 1")
+
+    def test_slots_rows(self) -> None:
+        """Test row_type=True builds rows named after the columns."""
+        with ExecuteQuery("SELECT id, name, age FROM users ORDER BY id LIMIT 1",
+                          db_name=self.database, stream=True, row_type=True) as rows:
+            row, = rows
+        self.assertEqual((row.id, row.name, row.age), (1, 'user0', 20))
+        self.assertEqual(tuple(row), (1, 'user0', 20))
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def test_callable_row_type(self) -> None:
+        """Test any callable taking the column values can build the rows."""
+        with ExecuteQuery("SELECT name, age FROM users ORDER BY id", db_name=self.database,
+                          row_type=lambda name, age: f"{name}:{age}") as results:
+            self.assertEqual(results, ['user0:20', 'user1:21', 'user2:22'])
+
+
+class TestRowClass(unittest.TestCase):
+    """
+    Test class for 1-execute.row_class.
+    """
+
+    def test_invalid_and_duplicate_names(self) -> None:
+        """Test unusable column names become col<i> without clashing."""
+        row = execute.row_class(('id', 'id', 'count(*)', 'class', '_x', 'col2'))(1, 2, 3, 4, 5, 6)
+        self.assertEqual(repr(row),
+                         "Row(id=1, col1=2, col2_=3, col3=4, col4=5, col2=6)")
+
+    def test_class_reused(self) -> None:
+        """Test the same columns share one class."""
+        self.assertIs(execute.row_class(('a', 'b')), execute.row_class(('a', 'b')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for parallel_query.ParallelQuery.
+"""
+
+import math
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import parallel_query
+from fixtures import create_users
+from parallel_query import ParallelQuery
+
+
+def summarize(columns: dict) -> tuple:
+    """Transform: the chunk's ids, ages as floats and names, copied out."""
+    return ([int(v) for v in columns['id']],
+            [None if v is None or math.isnan(v) else float(v) for v in columns['age']],
+            list(columns['name']))
+
+
+class TestParallelQuery(unittest.TestCase):
+    """
+    Test class for parallel_query.ParallelQuery.
+    """
+
+    def setUp(self) -> None:
+        """Create 25 users, one of them without an age."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_users(self.database, rows=25)
+        conn = sqlite3.connect(self.database)
+        conn.execute("UPDATE users SET age = NULL WHERE id = 7")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def run_query(self, **options) -> list:
+        """Chunk results of the users query, in order."""
+        query = ParallelQuery("SELECT id, age, name FROM users ORDER BY id", transform=summarize,
+                              db_name=self.database, chunk_size=4, workers=2, **options)
+        with query as results:
+            chunks = list(results)
+        self.assertEqual(query._blocks, [])
+        return chunks
+
+    def test_shared_matches_pickled(self) -> None:
+        """Test shared-memory columns give the same chunks as pickled ones."""
+        pickled = self.run_query()
+        self.assertEqual(self.run_query(numeric_columns=('id', 'age')), pickled)
+        self.assertEqual([chunk[0] for chunk in pickled],
+                         [list(range(i, min(i + 4, 26))) for i in range(1, 26, 4)])
+        self.assertIsNone(pickled[1][1][2])
+
+    def test_non_numeric_column_rejected(self) -> None:
+        """Test a text column can't be shared and no block is left behind."""
+        with self.assertRaises(TypeError):
+            self.run_query(numeric_columns=('name',))
+
+    def test_stopping_early_releases_blocks(self) -> None:
+        """Test leaving the with-block mid-scan unlinks every block."""
+        query = ParallelQuery("SELECT id, age, name FROM users", transform=summarize,
+                              db_name=self.database, chunk_size=2, workers=1,
+                              numeric_columns=('id',))
+        with query as results:
+            next(results)
+            names = [block.name for block in query._blocks]
+        self.assertEqual(len(names), 2)
+        self.assertEqual(query._blocks, [])
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                parallel_query.shared_memory.SharedMemory(name=name)
+
+    def test_enter_failure_closes_connection(self) -> None:
+        """Test a failing execute or pool start leaves nothing open."""
+        query = ParallelQuery("SELECT nope FROM users", transform=summarize,
+                              db_name=self.database)
+        with self.assertRaises(sqlite3.OperationalError):
+            query.__enter__()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            query.conn.execute("SELECT 1")
+
+        query = ParallelQuery("SELECT id FROM users", transform=summarize,
+                              db_name=self.database, numeric_columns=('id',))
+        with patch.object(parallel_query, 'ProcessPoolExecutor', side_effect=OSError):
+            with self.assertRaises(OSError):
+                query.__enter__()
+        self.assertEqual(query._blocks, [])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            query.conn.execute("SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,59 @@
-import sqlite3
+import os
+import random
 import functools
+import time
+from contextlib import redirect_stdout
 from datetime import datetime
 
-# Decorator to log SQL queries with timestamps
-def log_queries(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        query = kwargs.get('query') if 'query' in kwargs else args[0] if args else None
-        if query:
-            print(f"[{datetime.now().isoformat()}] Executing SQL Query: {query}")
-        else:
-            print(f"[{datetime.now().isoformat()}] No SQL query found to log.")
-        return func(*args, **kwargs)
-    return wrapper
+from db_profile import connect
+from query_log import QueryLog, default_log
+
+# Decorator to log SQL queries with timestamps.
+# Bare @log_queries prints every query. @log_queries(structured=True) instead
+# records query, parameter fingerprint, duration and row count in a QueryLog,
+# whose background thread writes them out in batches. Queries that raise are
+# recorded too, with their duration, no row count and an error flag.
+def log_queries(func=None, *, structured=False, sample_rate=None, log=None):
+    def decorator(func):
+        if not structured:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                query = kwargs.get('query') if 'query' in kwargs else args[0] if args else None
+                if query:
+                    print(f"[{datetime.now().isoformat()}] Executing SQL Query: {query}")
+                else:
+                    print(f"[{datetime.now().isoformat()}] No SQL query found to log.")
+                return func(*args, **kwargs)
+            return wrapper
+
+        sink = log or default_log()
+        rate = sink.sample_rate if sample_rate is None else sample_rate
+
+        @functools.wraps(func)
+        def structured_wrapper(*args, **kwargs):
+            if rate < 1 and random.random() >= rate:
+                return func(*args, **kwargs)
+            result = None
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                duration = time.perf_counter() - start
+                if 'query' in kwargs:
+                    query, params = kwargs['query'], kwargs.get('params') or args
+                else:
+                    query, params = (args[0], args[1:]) if args else (None, ())
+                rows = len(result) if isinstance(result, list) else None
+                sink.record(query, params, duration, rows, failed)
+        return structured_wrapper
+    return decorator(func) if func is not None else decorator
 
 @log_queries
 def fetch_all_users(query):
-    conn = sqlite3.connect('users.db')
+    conn = connect('users.db')
     cursor = conn.cursor()
     cursor.execute(query)
     results = cursor.fetchall()
@@ -25,3 +62,33 @@ def fetch_all_users(query):
 
 users = fetch_all_users(query="SELECT * FROM users")
 print(users)
+
+# Microbenchmark: per-call overhead of the decorator with logging off, print
+# logging, and structured logging (full and 10% sampled)
+def benchmark(calls=100000):
+    def query_fn(query):
+        return [(1, 'user')]
+
+    devnull = open(os.devnull, 'w')
+    log = QueryLog(sink=devnull)
+    variants = (
+        ('no logging', query_fn),
+        ('print', log_queries(query_fn)),
+        ('structured', log_queries(structured=True, log=log)(query_fn)),
+        ('structured 10%', log_queries(structured=True, sample_rate=0.1, log=log)(query_fn)),
+    )
+    baseline = None
+    for label, fn in variants:
+        with redirect_stdout(devnull):
+            start = time.perf_counter()
+            for _ in range(calls):
+                fn(query="SELECT * FROM users")
+            elapsed = time.perf_counter() - start
+        per_call = elapsed / calls * 1e6
+        baseline = per_call if baseline is None else baseline
+        print(f"{label:>15}: {per_call:6.2f}us/call (+{per_call - baseline:.2f}us overhead)")
+    log.close()
+    devnull.close()
+
+if __name__ == "__main__":
+    benchmark()
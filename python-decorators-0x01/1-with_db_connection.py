@@ -1,17 +1,18 @@
-import sqlite3
 import functools
 
+from db_pool import get_pool
+
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
+        # Borrow a warm connection from the pool instead of connecting per call
+        with get_pool('users.db').connection() as conn:
             # Inject the connection as the first argument
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
     return wrapper
 
+# The same SQL text on a pooled connection hits sqlite3's statement cache,
+# so the query is only parsed once per connection
 @with_db_connection
 def get_user_by_id(conn, user_id):
     cursor = conn.cursor()
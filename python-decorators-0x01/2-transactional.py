@@ -1,31 +1,233 @@
+import os
+import sys
+import time
+import queue
 import sqlite3
+import tempfile
+import threading
 import functools
+from concurrent.futures import Future
+
+from cache_store import connection_database, invalidate_writes
+from db_pool import get_pool
+from db_profile import connect
 
 # Decorator to automatically manage DB connections
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
+        with get_pool('users.db').connection() as conn:
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
     return wrapper
 
-# Decorator to automatically commit or rollback transactions
+# Statement lists of the transactional calls open on each connection,
+# outermost first: {id(conn): (conn, [statements, ...])}. sqlite3 can't
+# report the current trace callback, so nested calls on one connection
+# share a single callback that appends to every open list; it is installed
+# by the outermost call and removed when that call ends.
+_traces = {}
+_traces_lock = threading.Lock()
+
+def _start_trace(conn):
+    statements = []
+    with _traces_lock:
+        entry = _traces.get(id(conn))
+        if entry is None:
+            stack = []
+            _traces[id(conn)] = (conn, stack)
+
+            def trace(statement):
+                for open_statements in stack:
+                    open_statements.append(statement)
+            conn.set_trace_callback(trace)
+        else:
+            stack = entry[1]
+        stack.append(statements)
+    return statements
+
+def _end_trace(conn):
+    with _traces_lock:
+        stack = _traces[id(conn)][1]
+        stack.pop()
+        if not stack:
+            del _traces[id(conn)]
+            conn.set_trace_callback(None)
+
+# Decorator to automatically commit or rollback transactions.
+# Statements run inside the transaction are traced so that, after a
+# successful commit, cached reads of the written tables are invalidated.
 def transactional(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        statements = _start_trace(conn)
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
-            return result
         except Exception as e:
             conn.rollback()
             print(f"[ERROR] Transaction failed: {e}")
             raise
+        finally:
+            _end_trace(conn)
+        invalidate_writes(connection_database(conn), statements)
+        return result
     return wrapper
 
+# Sentinel that stops a GroupCommitter's writer thread
+_STOP = object()
+
+class GroupCommitter:
+    """
+    Coalesces writes from many calls and threads into shared transactions.
+
+    submit(func, *args) queues func(conn, *args) for a single writer thread
+    that owns its own connection. The writer collects up to max_batch
+    writes, or whatever arrives within max_delay seconds of the first one,
+    runs each inside its own SAVEPOINT and commits the batch once, so many
+    writes share one fsync. With max_delay=0 nothing waits: a batch is
+    whatever queued up while the previous commit was running. A write that
+    raises is rolled back to its savepoint alone; the others still commit.
+    Every caller gets a Future that resolves after the batch commits. If
+    the batch itself fails (BEGIN or COMMIT errors, or a write that ends
+    the transaction itself, which writes must not do) it is rolled back,
+    every write in it gets the error and the writer carries on with the
+    next batch. submit() raises RuntimeError once the committer is closed
+    or its writer has stopped.
+    """
+
+    def __init__(self, database='users.db', max_batch=100, max_delay=0.0, profile=None):
+        self.database = database
+        self.profile = profile
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a write; returns a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitter is closed.")
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    @staticmethod
+    def _fail(future, error):
+        # Fail a future unless it already has a result or was cancelled
+        if future.done():
+            return
+        if future.running() or future.set_running_or_notify_cancel():
+            future.set_exception(error)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return None
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        conn = None
+        error = RuntimeError("GroupCommitter is closed.")
+        try:
+            # isolation_level=None: BEGIN/SAVEPOINT/COMMIT are issued explicitly
+            conn = connect(self.database, self.profile, isolation_level=None)
+            statements = []
+            conn.set_trace_callback(statements.append)
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    break
+                statements.clear()
+                try:
+                    self._write_batch(conn, batch)
+                finally:
+                    invalidate_writes(self.database, statements)
+        except BaseException as e:
+            error = RuntimeError(f"GroupCommitter writer stopped: {e}")
+            raise
+        finally:
+            # Refuse new writes and fail any still queued
+            with self._lock:
+                self._closed = True
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    self._fail(item[0], error)
+            if conn is not None:
+                conn.close()
+
+    def _write_batch(self, conn, batch):
+        done = []
+        try:
+            conn.execute("BEGIN")
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    future.set_exception(e)
+                else:
+                    conn.execute("RELEASE write")
+                    done.append((future, result))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            # The whole batch is lost: roll back and fail every write in it
+            # that hasn't already failed on its own
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            for future, _, _, _ in batch:
+                self._fail(future, e)
+            return
+        for future, result in done:
+            future.set_result(result)
+
+    def close(self):
+        """Commit everything queued so far and stop the writer."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join()
+
+# Decorator that runs func(conn, ...) through a GroupCommitter. It replaces
+# the with_db_connection + transactional pair: the call blocks until the
+# batch holding the write has committed and then returns func's result (or
+# raises its error).
+def group_transactional(committer):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return committer.submit(func, *args, **kwargs).result()
+        wrapper.submit = functools.partial(committer.submit, func)
+        return wrapper
+    return decorator
+
 @with_db_connection
 @transactional
 def update_user_email(conn, user_id, new_email):
@@ -34,3 +236,62 @@ def update_user_email(conn, user_id, new_email):
 
 # Update user's email with automatic transaction handling
 update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+
+# Compare updates/sec for a commit per call with group commit, both from
+# many threads and from one thread submitting without waiting
+def benchmark(updates=2000, threads=8):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         [(f"user{i}", f"user{i}@example.com") for i in range(1000)])
+        conn.commit()
+        conn.close()
+
+        def set_email(conn, user_id, new_email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+        per_call = transactional(set_email)
+        pool = get_pool(database)
+        committer = GroupCommitter(database)
+        grouped = group_transactional(committer)(set_email)
+
+        def run_threads(call):
+            def worker(offset):
+                for i in range(offset, updates, threads):
+                    call(i % 1000 + 1, f"new{i}@example.com")
+            workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+        def per_call_update(user_id, new_email):
+            with pool.connection() as conn:
+                per_call(conn, user_id, new_email)
+
+        def submit_all():
+            futures = [grouped.submit(i % 1000 + 1, f"new{i}@example.com")
+                       for i in range(updates)]
+            for future in futures:
+                future.result()
+
+        runs = (
+            (f'commit per call, {threads} threads', lambda: run_threads(per_call_update)),
+            (f'group commit, {threads} threads', lambda: run_threads(grouped)),
+            ('group commit, 1 thread submit', submit_all),
+        )
+        results = {}
+        for label, run in runs:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            results[label] = updates / elapsed
+            print(f"{label:>32}: {results[label]:,.0f} updates/sec")
+        committer.close()
+        pool.close()
+    return results
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,35 +1,239 @@
 import time
+import random
+import asyncio
+import inspect
 import sqlite3
+import threading
 import functools
 
+from db_pool import get_pool
+
 # Reusing with_db_connection from previous task
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
+        with get_pool('users.db').connection() as conn:
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
     return wrapper
 
-# Decorator factory to retry on failure
-def retry_on_failure(retries=3, delay=2):
+# sqlite3 errors that usually clear up on their own
+TRANSIENT_MESSAGES = (
+    'database is locked',
+    'database table is locked',
+    'database schema has changed',
+    'disk i/o error',
+    'unable to open database file',
+)
+
+def is_transient(error):
+    """Default retry classifier: only retry errors a retry can fix."""
+    if isinstance(error, sqlite3.OperationalError):
+        message = str(error).lower()
+        return any(text in message for text in TRANSIENT_MESSAGES)
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+class RetryBudget:
+    """
+    Token bucket shared by many call sites that caps retries to a fraction
+    of successful calls, so an outage can't multiply load by `retries`.
+
+    Every success adds `ratio` tokens (up to max_tokens) and every retry
+    spends one; min_tokens lets a quiet service still retry occasionally.
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10, max_tokens=100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing dependency.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. After reset_timeout seconds one trial
+    call is let through (half-open); its success closes the circuit and its
+    failure opens it again. A trial that ends without a verdict (cancelled
+    or interrupted) must call release() so the next call can try instead.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """End a call without recording a result."""
+        with self._lock:
+            self._trial_running = False
+
+class _Attempts:
+    """Retry bookkeeping shared by the sync and async wrappers."""
+
+    def __init__(self, retries, delay, backoff, max_delay, jitter, deadline,
+                 retry_on, budget, breaker):
+        self.retries = retries
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = None if deadline is None else time.monotonic() + deadline
+        self.retry_on = retry_on
+        self.budget = budget
+        self.breaker = breaker
+        self.attempt = 0
+        self._unsettled = False
+
+    def before(self):
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError("Circuit is open; not calling the database.")
+        self._unsettled = self.breaker is not None
+        self.attempt += 1
+
+    def settle(self):
+        """
+        Called after every attempt. An attempt that neither succeeded nor
+        failed (cancelled, interrupted, or retry_on raised) releases the
+        breaker so a half-open circuit is never left waiting on its trial.
+        """
+        if self._unsettled:
+            self._unsettled = False
+            self.breaker.release()
+
+    def succeeded(self):
+        if self.breaker is not None:
+            self._unsettled = False
+            self.breaker.record_success()
+        if self.budget is not None:
+            self.budget.record_success()
+
+    def failed(self, error):
+        """Return the seconds to wait before retrying, or None to give up."""
+        transient = self.retry_on(error)
+        if self.breaker is not None:
+            # A non-transient error still means the database answered
+            self._unsettled = False
+            if transient:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        print(f"[WARNING] Attempt {self.attempt} failed with error: {error}")
+        if not transient:
+            print("[ERROR] Error is not transient. Raising exception.")
+            return None
+        if self.attempt >= self.retries:
+            print("[ERROR] All retries failed. Raising exception.")
+            return None
+        # Exponential backoff with full jitter: uniform in [0, cap]
+        cap = min(self.max_delay, self.delay * self.backoff ** (self.attempt - 1))
+        wait = random.uniform(0, cap) if self.jitter else cap
+        if self.deadline is not None and time.monotonic() + wait > self.deadline:
+            print("[ERROR] Retry deadline exceeded. Raising exception.")
+            return None
+        if self.budget is not None and not self.budget.try_spend():
+            print("[ERROR] Retry budget exhausted. Raising exception.")
+            return None
+        return wait
+
+# Decorator factory to retry on failure.
+# Retries only errors retry_on() accepts (transient ones by default), waits
+# with exponential backoff and full jitter, gives up after `retries`
+# attempts or once `deadline` seconds have passed, and can share a
+# RetryBudget and CircuitBreaker across functions. Coroutine functions are
+# retried with asyncio.sleep so the event loop is never blocked.
+def retry_on_failure(retries=3, delay=2, backoff=2.0, max_delay=30.0, jitter=True,
+                     deadline=None, retry_on=is_transient, budget=None, breaker=None):
+    def attempts():
+        return _Attempts(retries, delay, backoff, max_delay, jitter, deadline,
+                         retry_on, budget, breaker)
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                state = attempts()
+                while True:
+                    state.before()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        wait = state.failed(e)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+                    else:
+                        state.succeeded()
+                        return result
+                    finally:
+                        state.settle()
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            attempt = 0
-            while attempt < retries:
+            state = attempts()
+            while True:
+                state.before()
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except Exception as e:
-                    attempt += 1
-                    print(f"[WARNING] Attempt {attempt} failed with error: {e}")
-                    if attempt == retries:
-                        print("[ERROR] All retries failed. Raising exception.")
+                    wait = state.failed(e)
+                    if wait is None:
                         raise
-                    else:
-                        time.sleep(delay)
+                    time.sleep(wait)
+                else:
+                    state.succeeded()
+                    return result
+                finally:
+                    state.settle()
         return wrapper
     return decorator
 
@@ -2,33 +2,83 @@ import time
 import sqlite3
 import functools
 
-query_cache = {}
+from cache_store import QueryCache, SingleFlight, connection_database, default_cache
+from db_pool import get_pool
+
+# Results are keyed by database, query and parameters, bounded in entries
+# and bytes, and dropped when transactional() commits a write to a table
+query_cache = default_cache
 
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
+        with get_pool('users.db').connection() as conn:
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
     return wrapper
 
-def cache_query(func):
-    @functools.wraps(func)
-    def wrapper(conn, query, *args, **kwargs):
-        if query in query_cache:
-            print("[CACHE] Returning cached result")
-            return query_cache[query]
-        else:
+def cache_query(func=None, *, cache=None, database='users.db', ttl=None, stale_ttl=0.0,
+                single_flight=True, verbose=False):
+    """
+    Cache results of func(conn, query, *params).
+
+    Usable bare (@cache_query) or configured (@cache_query(ttl=60)).
+    Entries are keyed by the database `conn` is actually attached to, so
+    one function used against several databases never mixes their
+    results; `database` only names the database of non-sqlite3
+    connections.
+
+    Concurrent misses for the same key run the query once and share its
+    result (single_flight=False turns this off). With stale_ttl > 0 an
+    entry up to stale_ttl seconds past its TTL is still returned while one
+    background refresh, on a connection from the database's pool, reloads
+    it.
+    """
+    def decorator(func):
+        store = query_cache if cache is None else cache
+        flights = SingleFlight()
+
+        def load(conn, key, query, args, kwargs):
+            # Taken first, so a write landing during the query keeps the
+            # result out of the cache
+            generation = store.generation(key)
             result = func(conn, query, *args, **kwargs)
-            query_cache[query] = result
-            print("[CACHE] Caching result for query")
+            store.set(key, result, ttl, generation)
             return result
-    return wrapper
+
+        def refresh(key, query, args, kwargs):
+            with get_pool(key[0]).connection() as conn:
+                return load(conn, key, query, args, kwargs)
+
+        @functools.wraps(func)
+        def wrapper(conn, query, *args, **kwargs):
+            identity = connection_database(conn) if isinstance(conn, sqlite3.Connection) \
+                else database
+            key = QueryCache.make_key(identity, query, args, kwargs)
+            # Only a database file can be reopened for a background refresh
+            grace = 0.0 if identity.startswith(':memory:') else stale_ttl
+            hit, result, stale = store.lookup(key, grace)
+            if hit:
+                if stale:
+                    flights.do_in_background(
+                        key, functools.partial(refresh, key, query, args, kwargs))
+                if verbose:
+                    print("[CACHE] Returning stale result, refreshing" if stale
+                          else "[CACHE] Returning cached result")
+                return result
+            if not single_flight:
+                result, shared = load(conn, key, query, args, kwargs), False
+            else:
+                result, shared = flights.do(
+                    key, functools.partial(load, conn, key, query, args, kwargs))
+            if verbose:
+                print("[CACHE] Returning result of in-flight query" if shared
+                      else "[CACHE] Caching result for query")
+            return result
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 @with_db_connection
-@cache_query
+@cache_query(verbose=True)
 def fetch_users_with_cache(conn, query):
     cursor = conn.cursor()
     cursor.execute(query)
@@ -0,0 +1,575 @@
+import hashlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Every live QueryCache, so a write can invalidate all of them
+_caches = weakref.WeakSet()
+
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?(\w+)', re.IGNORECASE)
+_WRITE_TABLES = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM'
+    r'|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE)\s+["`\[]?(\w+)',
+    re.IGNORECASE)
+
+
+def database_id(database):
+    """Normalize a database path so 'users.db' and its absolute path match."""
+    return database if database == '' or database.startswith(':memory:') \
+        else os.path.abspath(database)
+
+
+# Database identity of each connection seen by connection_database().
+# Connections that can be weakly referenced drop out on their own; plain
+# sqlite3 connections are held in {id(conn): (conn, identity)}, checked by
+# identity and evicted oldest first beyond MAX_PLAIN_CONNECTIONS entries
+# or by forget_connection().
+_connection_ids = weakref.WeakKeyDictionary()
+_plain_ids = {}
+_plain_lock = threading.Lock()
+_memory_ids = itertools.count()
+MAX_PLAIN_CONNECTIONS = 256
+
+
+def connection_database(conn):
+    """
+    Identity of the database a sqlite3 connection is attached to.
+
+    That is the absolute path of its main file, as PRAGMA database_list
+    reports it, so it matches what transactional() invalidates. An
+    in-memory or temporary database gets a token of its own, since no
+    other connection sees its data. The PRAGMA runs once per connection.
+    """
+    entry = _plain_ids.get(id(conn))
+    if entry is not None and entry[0] is conn:
+        return entry[1]
+    try:
+        return _connection_ids[conn]
+    except KeyError:
+        weak = True
+    except TypeError:
+        weak = False
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    identity = database_id(path) if path else f":memory:{next(_memory_ids)}"
+    if weak:
+        _connection_ids[conn] = identity
+        return identity
+    with _plain_lock:
+        _plain_ids.pop(id(conn), None)
+        _plain_ids[id(conn)] = (conn, identity)
+        while len(_plain_ids) > MAX_PLAIN_CONNECTIONS:
+            del _plain_ids[next(iter(_plain_ids))]
+    return identity
+
+
+def forget_connection(conn):
+    """Drop a connection's cached identity, e.g. when closing it."""
+    with _plain_lock:
+        entry = _plain_ids.get(id(conn))
+        if entry is not None and entry[0] is conn:
+            del _plain_ids[id(conn)]
+    try:
+        _connection_ids.pop(conn, None)
+    except TypeError:
+        pass
+
+
+def read_tables(query):
+    """Tables a SELECT reads from, lower-cased."""
+    return frozenset(name.lower() for name in _READ_TABLES.findall(query))
+
+
+def written_tables(statements):
+    """Tables modified by any of the given SQL statements, lower-cased."""
+    tables = set()
+    for statement in statements:
+        match = _WRITE_TABLES.match(statement)
+        if match:
+            tables.add(match.group(1).lower())
+    return tables
+
+
+def _sizeof(value, depth=0):
+    """Rough size in bytes of a query result (rows of scalars)."""
+    size = sys.getsizeof(value)
+    if depth < 2 and isinstance(value, (list, tuple)):
+        size += sum(_sizeof(item, depth + 1) for item in value)
+    elif isinstance(value, dict):
+        size += sum(_sizeof(item, depth + 1) for item in value.values())
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'expires', 'size', 'tables')
+
+    def __init__(self, value, expires, size, tables):
+        self.value = value
+        self.expires = expires
+        self.size = size
+        self.tables = tables
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results.
+
+    Entries are keyed by database, query text and parameters, expire after
+    a TTL, and are evicted least-recently-used first once max_entries or
+    max_bytes (an estimate of the cached rows' size) is exceeded. Each
+    entry remembers the tables its query reads, so invalidate_tables() can
+    drop everything a write made stale.
+
+    Every invalidation also bumps a per-table generation. A loader takes
+    generation(key) before running its query and passes it to set(), which
+    refuses the result if one of the tables was invalidated meanwhile, so
+    a slow load can't put back rows a write has already replaced.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._generations = {}  # (database, table) -> invalidation count
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.stale_hits = 0
+        _caches.add(self)
+
+    @staticmethod
+    def make_key(database, query, args=(), kwargs=None):
+        """Build a hashable key from the database, query and bound parameters."""
+        params = tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+        if kwargs:
+            params += tuple(sorted(kwargs.items()))
+        try:
+            hash(params)
+        except TypeError:
+            params = repr(params)
+        return database_id(database), query, params
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss."""
+        hit, value, _ = self.lookup(key)
+        return hit, value
+
+    def lookup(self, key, grace=0.0):
+        """
+        Return (hit, value, stale). An entry expired less than `grace`
+        seconds ago is still returned, with stale=True, so the caller can
+        serve it while refreshing it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None, False
+            stale = entry.expires is not None and entry.expires <= time.monotonic()
+            if stale and entry.expires + grace <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None, False
+            self._entries.move_to_end(key)
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return True, entry.value, stale
+
+    def generation(self, key):
+        """Invalidation generation of the tables key's query reads."""
+        return tuple(self._generations.get((key[0], table), 0)
+                     for table in sorted(read_tables(key[1])))
+
+    def set(self, key, value, ttl=None, generation=None):
+        """
+        Store a result, evicting least recently used entries as needed.
+        Returns False if it wasn't stored: too big, or `generation` (from
+        generation(key) before the load) is out of date.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        size = _sizeof(value)
+        entry = _Entry(value, expires, size, read_tables(key[1]))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+            if generation is not None and generation != self.generation(key):
+                return False
+            self._entries[key] = entry
+            self._bytes += size
+            for table in entry.tables:
+                self._by_table.setdefault((key[0], table), set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        """Drop one entry. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get((key[0], table))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[(key[0], table)]
+
+    def invalidate_tables(self, database, tables):
+        """Drop every entry for `database` that reads one of `tables`."""
+        database = database_id(database)
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._generations[(database, table)] = \
+                    self._generations.get((database, table), 0) + 1
+                for key in list(self._by_table.get((database, table), ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._generations.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'invalidations': self.invalidations}
+
+
+class SharedQueryCache:
+    """
+    Query cache stored in a local SQLite file, shared by every process on
+    the node that opens the same path.
+
+    It has the same interface as QueryCache, so it can be passed to
+    cache_query(cache=...). Values are pickled and zlib-compressed above
+    compress_over bytes. The file runs in WAL mode so lookups from many
+    processes don't block each other. Recency is refreshed at most once per
+    touch_interval seconds per entry, which keeps hits read-only in the
+    common case; eviction beyond max_entries removes the least recently
+    touched entries. Invalidation generations are kept in the file too, so
+    set() refuses a load that any process's write overtook. Hit/miss
+    counters are per process.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=300.0, compress_over=1024,
+                 touch_interval=1.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.compress_over = compress_over
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.stale_hits = 0
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key BLOB PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires REAL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_entries_last_used ON cache_entries (last_used);
+            CREATE TABLE IF NOT EXISTS cache_tables (
+                key BLOB NOT NULL,
+                database TEXT NOT NULL,
+                table_name TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_tables_lookup ON cache_tables (database, table_name);
+            CREATE INDEX IF NOT EXISTS cache_tables_key ON cache_tables (key);
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                database TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                PRIMARY KEY (database, table_name)
+            );
+        """)
+        _caches.add(self)
+
+    make_key = staticmethod(QueryCache.make_key)
+
+    def _conn(self):
+        """One connection per thread and per process (connections don't survive fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+    def _dumps(self, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.compress_over:
+            return b'z' + zlib.compress(data, 1)
+        return b'p' + data
+
+    @staticmethod
+    def _loads(blob):
+        data = blob[1:]
+        return pickle.loads(zlib.decompress(data) if blob[:1] == b'z' else data)
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss."""
+        hit, value, _ = self.lookup(key)
+        return hit, value
+
+    def lookup(self, key, grace=0.0):
+        """Return (hit, value, stale), as QueryCache.lookup does."""
+        digest = self._digest(key)
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires, last_used FROM cache_entries WHERE key = ?",
+                           (digest,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return False, None, False
+        value, expires, last_used = row
+        stale = expires is not None and expires <= now
+        if stale and expires + grace <= now:
+            self._delete(conn, [digest])
+            self.expirations += 1
+            self.misses += 1
+            return False, None, False
+        if now - last_used > self.touch_interval:
+            conn.execute("UPDATE cache_entries SET last_used = ? WHERE key = ?", (now, digest))
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return True, self._loads(value), stale
+
+    def generation(self, key, conn=None):
+        """Invalidation generation of the tables key's query reads."""
+        conn = conn or self._conn()
+        return tuple(
+            (conn.execute("SELECT generation FROM cache_generations "
+                          "WHERE database = ? AND table_name = ?",
+                          (key[0], table)).fetchone() or (0,))[0]
+            for table in sorted(read_tables(key[1])))
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store a result; returns False if `generation` is out of date."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        digest = self._digest(key)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if generation is not None and generation != self.generation(key, conn):
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                         (digest, self._dumps(value), now + ttl if ttl else None, now))
+            conn.execute("DELETE FROM cache_tables WHERE key = ?", (digest,))
+            conn.executemany("INSERT INTO cache_tables VALUES (?, ?, ?)",
+                             [(digest, key[0], table) for table in read_tables(key[1])])
+            excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] \
+                - self.max_entries
+            if excess > 0:
+                oldest = [row[0] for row in conn.execute(
+                    "SELECT key FROM cache_entries ORDER BY last_used LIMIT ?", (excess,))]
+                self._delete(conn, oldest, in_transaction=True)
+                self.evictions += len(oldest)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def _delete(self, conn, digests, in_transaction=False):
+        if not in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(d,) for d in digests])
+        conn.executemany("DELETE FROM cache_tables WHERE key = ?", [(d,) for d in digests])
+        if not in_transaction:
+            conn.execute("COMMIT")
+
+    def invalidate_tables(self, database, tables):
+        database = database_id(database)
+        conn = self._conn()
+        digests = set()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in tables:
+                table = table.lower()
+                conn.execute(
+                    "INSERT INTO cache_generations VALUES (?, ?, 1) "
+                    "ON CONFLICT (database, table_name) DO UPDATE SET generation = generation + 1",
+                    (database, table))
+                digests.update(row[0] for row in conn.execute(
+                    "SELECT key FROM cache_tables WHERE database = ? AND table_name = ?",
+                    (database, table)))
+            self._delete(conn, list(digests), in_transaction=True)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.invalidations += len(digests)
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM cache_entries")
+        conn.execute("DELETE FROM cache_tables")
+        conn.execute("DELETE FROM cache_generations")
+        conn.execute("COMMIT")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def stats(self):
+        return {'entries': len(self), 'hits': self.hits, 'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions, 'expirations': self.expirations,
+                'invalidations': self.invalidations}
+
+
+def invalidate_writes(database, statements):
+    """Invalidate cached reads of the tables written by `statements`."""
+    tables = written_tables(statements)
+    if tables:
+        for cache in list(_caches):
+            cache.invalidate_tables(database, tables)
+    return tables
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller of do(key, fn) runs fn; callers arriving while it runs
+    wait for it and get the same result (or exception) instead of running
+    fn themselves.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return (result, shared); shared is True if another caller ran fn."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do_in_background(self, key, fn):
+        """Run fn on a daemon thread unless a call for key is already running."""
+        if self.in_flight(key):
+            return False
+
+        def run():
+            try:
+                self.do(key, fn)
+            except Exception:
+                pass  # The stale entry stays until it expires past its grace
+
+        threading.Thread(target=run, name='cache-refresh', daemon=True).start()
+        return True
+
+
+# Shared cache used by cache_query unless another one is given
+default_cache = QueryCache()
+
+
+def _stress_worker(path, lookups, distinct, seed, results):
+    """One process of stress_test: look up random keys, filling misses."""
+    cache = SharedQueryCache(path)
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(lookups):
+        key = cache.make_key('users.db', 'SELECT * FROM users WHERE id = ?',
+                             (rng.randrange(distinct),))
+        start = time.perf_counter()
+        hit, _ = cache.get(key)
+        latencies.append(time.perf_counter() - start)
+        if not hit:
+            cache.set(key, [(key[2][0], f'user{key[2][0]}', f'user{key[2][0]}@example.com')])
+    results.put((cache.hits, cache.misses, latencies))
+
+
+def stress_test(processes=4, lookups=5000, distinct=500):
+    """
+    Run `processes` workers against one shared cache file and report the
+    combined hit ratio and lookup latency percentiles.
+    """
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'query_cache.db')
+        SharedQueryCache(path)
+        results = context.Queue()
+        workers = [context.Process(target=_stress_worker,
+                                   args=(path, lookups, distinct, n, results))
+                   for n in range(processes)]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    hits = sum(outcome[0] for outcome in outcomes)
+    misses = sum(outcome[1] for outcome in outcomes)
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[2])
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    ratio = hits / (hits + misses)
+    print(f"{processes} processes, {distinct} distinct queries: hit ratio {ratio:.1%} "
+          f"(a private cache per process would miss at least {processes * distinct} times, "
+          f"shared missed {misses}); lookup p50 {p50:.0f}us, p99 {p99:.0f}us")
+    return {'hit_ratio': ratio, 'misses': misses, 'p50_us': p50, 'p99_us': p99}
+
+
+if __name__ == '__main__':
+    stress_test(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,257 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import db_profile
+
+# Registry of pools, one per database path, profile and set of options
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of sqlite3 connections to one database.
+
+    A thread checks out one connection and keeps it until its outermost
+    checkout is released, so nested decorated calls on the same thread share
+    a connection. Idle connections are reused most-recently-used first
+    (they are the warmest), closed once idle longer than idle_timeout (down
+    to min_size), and pinged with SELECT 1 before reuse if they have been
+    idle longer than health_check_interval. New connections are opened
+    with the named db_profile settings (DEFAULT_PROFILE when None).
+
+    The lock is only held to take an idle connection or reserve a slot for
+    a new one. Connecting and the health check run outside it, so a slow
+    connect doesn't hold up releases or other checkouts.
+    """
+
+    def __init__(self, database, min_size=1, max_size=10, idle_timeout=300.0,
+                 health_check_interval=30.0, checkout_timeout=30.0, profile=None,
+                 **connect_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Require 0 <= min_size <= max_size and max_size >= 1.")
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.profile = profile
+        db_profile.get_profile(profile)
+        # Connections move between threads, so sqlite3's same-thread check
+        # is replaced by the pool's own one-thread-at-a-time guarantee.
+        self.connect_kwargs = dict(connect_kwargs, check_same_thread=False)
+        self._idle = deque()  # (connection, last_used) pairs
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._local = threading.local()
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        return db_profile.connect(self.database, self.profile, **self.connect_kwargs)
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a connection that is leaving the pool. Caller holds the lock."""
+        self._size -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _reap(self, now):
+        """Close connections idle past idle_timeout. Caller holds the lock."""
+        while self._size > self.min_size and self._idle:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+
+    def acquire(self, timeout=None):
+        """Check out a connection, reusing this thread's if it holds one."""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeout(f"Pool for {self.database} is closed.")
+                now = time.monotonic()
+                self._reap(now)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    stale = now - last_used > self.health_check_interval
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot; the connection is opened below
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection to {self.database} free after {timeout}s.")
+                self._lock.wait(remaining)
+
+        # The slot is ours now, so this can run without the lock
+        if conn is not None and stale and not self._healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except BaseException:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection; it goes back to the pool on the outermost release."""
+        if getattr(self._local, 'conn', None) is not conn:
+            raise ValueError("Connection was not checked out by this thread.")
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.conn = None
+
+        # Like closing a fresh connection, drop anything left uncommitted
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except sqlite3.Error:
+            reusable = False
+        with self._lock:
+            if reusable and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager around acquire() and release()."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        with self._lock:
+            return {'size': self._size, 'idle': len(self._idle),
+                    'in_use': self._size - len(self._idle)}
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed on release."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+            self._lock.notify_all()
+
+
+def get_pool(database='users.db', profile=None, **options):
+    """
+    Return the shared pool for a database path, creating it on first use.
+
+    Pools are keyed by the path, the profile (DEFAULT_PROFILE when None)
+    and the other options (min_size, isolation_level, ...), so callers
+    asking for differently configured connections get separate pools.
+    """
+    profile = db_profile.DEFAULT_PROFILE if profile is None else profile
+    path = os.path.abspath(database) if database != ':memory:' else database
+    key = (path, profile, tuple(sorted(options.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(database, profile=profile, **options)
+        return pool
+
+
+def close_pools():
+    """Close every registered pool."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def benchmark(threads=8, calls=2000):
+    """Compare calls/sec for per-call connections and pooled connections."""
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         [(f"user{i}", f"user{i}@example.com") for i in range(1000)])
+        conn.commit()
+        conn.close()
+
+        def per_call(user_id):
+            conn = sqlite3.connect(database)
+            try:
+                return conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            finally:
+                conn.close()
+
+        pool = ConnectionPool(database, min_size=threads, max_size=threads)
+
+        def pooled(user_id):
+            with pool.connection() as conn:
+                return conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+        results = {}
+        for label, call in (('per-call connect', per_call), ('pooled', pooled)):
+            def worker():
+                for i in range(calls):
+                    call(i % 1000 + 1)
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            results[label] = threads * calls / elapsed
+            print(f"{label:>16}: {results[label]:,.0f} calls/sec ({threads} threads)")
+        pool.close()
+    return results
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Named connection profiles: connect() arguments plus the PRAGMAs run on
+# every new connection. 'default' is stock sqlite3 (rollback journal,
+# synchronous=FULL, ~2 MiB page cache). 'tuned' switches to WAL so readers
+# and the writer no longer block each other, syncs only at checkpoints,
+# serves reads from memory-mapped pages and a 64 MiB page cache, and keeps
+# temp tables in memory. 'timeout' is sqlite's busy timeout: how long a
+# connection waits for a lock before raising "database is locked".
+PROFILES = {
+    'default': {
+        'timeout': 5.0,
+        'cached_statements': 128,
+        'pragmas': (),
+    },
+    'tuned': {
+        'timeout': 5.0,
+        'cached_statements': 512,
+        'pragmas': (
+            ('journal_mode', 'WAL'),
+            ('synchronous', 'NORMAL'),
+            ('mmap_size', 256 * 1024 * 1024),
+            ('cache_size', -64 * 1024),
+            ('temp_store', 'MEMORY'),
+        ),
+    },
+    'durable': {
+        'timeout': 5.0,
+        'cached_statements': 512,
+        'pragmas': (
+            ('journal_mode', 'WAL'),
+            ('synchronous', 'FULL'),
+            ('cache_size', -64 * 1024),
+        ),
+    },
+}
+
+# Profile used when none is named. Stock sqlite3 behaviour unless the
+# SQLITE_PROFILE variable opts in to another one (e.g. 'tuned'): WAL mode
+# persists in the database file and synchronous=NORMAL trades durability
+# of the last commits for speed, so neither is switched on silently.
+DEFAULT_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+
+
+def register_profile(name, pragmas=(), timeout=5.0, cached_statements=128):
+    """Add or replace a named profile."""
+    PROFILES[name] = {'timeout': timeout, 'cached_statements': cached_statements,
+                      'pragmas': tuple(pragmas)}
+
+
+def get_profile(name=None):
+    """Look up a profile by name (DEFAULT_PROFILE when None)."""
+    name = DEFAULT_PROFILE if name is None else name
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile {name!r}; "
+                         f"choose from {', '.join(sorted(PROFILES))}.") from None
+
+
+def pragma_statements(profile=None):
+    """The PRAGMA statements a profile runs, e.g. for an aiosqlite connection."""
+    return [f"PRAGMA {key}={value}" for key, value in get_profile(profile)['pragmas']]
+
+
+def apply_profile(conn, profile=None):
+    """Run a profile's PRAGMAs on an open connection and return it."""
+    for statement in pragma_statements(profile):
+        conn.execute(statement).fetchall()
+    return conn
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3.Connection that can be weakly referenced, so per-connection
+    state (such as prepared queries) can be kept without keeping it open."""
+
+
+def connect(database='users.db', profile=None, **kwargs):
+    """
+    sqlite3.connect() with a named profile applied.
+
+    The profile supplies timeout and cached_statements (the size of the
+    per-connection prepared statement cache); explicit kwargs win.
+    """
+    settings = get_profile(profile)
+    kwargs.setdefault('factory', Connection)
+    kwargs.setdefault('timeout', settings['timeout'])
+    kwargs.setdefault('cached_statements', settings['cached_statements'])
+    return apply_profile(sqlite3.connect(database, **kwargs), profile)
+
+
+def benchmark(profiles=('default', 'tuned'), readers=4, seconds=2.0, rows=10000):
+    """
+    Run one writer and `readers` reader threads against the same database
+    for `seconds` under each profile and report reads/sec, writes/sec and
+    how many operations failed with "database is locked".
+    """
+    results = {}
+    for name in profiles:
+        with tempfile.TemporaryDirectory() as workdir:
+            database = os.path.join(workdir, 'users.db')
+            conn = connect(database, name)
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, "
+                         "email TEXT, age INTEGER)")
+            conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                             [(f"user{i}", f"user{i}@example.com", i % 90)
+                              for i in range(rows)])
+            conn.commit()
+            conn.close()
+
+            stop = threading.Event()
+            counts = {'reads': 0, 'writes': 0, 'locked': 0}
+            lock = threading.Lock()
+
+            def run(operation):
+                conn = connect(database, name, timeout=0.1)
+                done = locked = i = 0
+                try:
+                    while not stop.is_set():
+                        i += 1
+                        try:
+                            operation(conn, i % rows + 1)
+                            done += 1
+                        except sqlite3.OperationalError:
+                            locked += 1
+                finally:
+                    conn.close()
+                key = 'writes' if operation is write else 'reads'
+                with lock:
+                    counts[key] += done
+                    counts['locked'] += locked
+
+            def read(conn, user_id):
+                conn.execute("SELECT * FROM users WHERE id BETWEEN ? AND ?",
+                             (user_id, user_id + 50)).fetchall()
+
+            def write(conn, user_id):
+                with conn:
+                    conn.execute("UPDATE users SET age = age + 1 WHERE id = ?", (user_id,))
+
+            threads = [threading.Thread(target=run, args=(write,))]
+            threads += [threading.Thread(target=run, args=(read,)) for _ in range(readers)]
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        results[name] = {key: value / seconds for key, value in counts.items()}
+        print(f"{name:>8}: {results[name]['reads']:>10,.0f} reads/sec "
+              f"{results[name]['writes']:>8,.0f} writes/sec "
+              f"{results[name]['locked']:>8,.0f} locked/sec ({readers} readers, 1 writer)")
+    return results
+
+
+if __name__ == '__main__':
+    benchmark(tuple(sys.argv[1:]) or ('default', 'tuned'))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the unit tests in this directory.
+
+The numbered scripts run their examples against users.db when imported,
+so import_script() imports them from a temporary directory holding a
+small users table, with their output silenced.
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+from contextlib import redirect_stdout
+
+_workdir = None
+
+
+def create_users(database: str, rows: int = 3) -> None:
+    """Create a users table with `rows` users in database."""
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, "
+                 "email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                     [(f"user{i}", f"user{i}@example.com", 20 + i)
+                      for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def import_script(name: str):
+    """Import a numbered script such as '2-transactional'."""
+    global _workdir
+    if _workdir is None:
+        _workdir = tempfile.TemporaryDirectory()
+        create_users(os.path.join(_workdir.name, 'users.db'))
+    cwd = os.getcwd()
+    os.chdir(_workdir.name)
+    try:
+        with redirect_stdout(io.StringIO()):
+            return __import__(name)
+    finally:
+        os.chdir(cwd)
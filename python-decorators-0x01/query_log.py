@@ -0,0 +1,319 @@
+import atexit
+import functools
+import hashlib
+import json
+import math
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w.])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(params):
+    """Short stable hash of bound parameters, so values never reach the log."""
+    if not params:
+        return None
+    return hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(query):
+    """
+    Replace literals with ? so statements differing only in values group
+    together: "WHERE id = 1" and "WHERE id = 2" both become "WHERE id = ?",
+    and IN lists of any length become "IN (...)".
+    """
+    if not query:
+        return query
+    query = _COMMENTS.sub(' ', query)
+    query = _STRINGS.sub('?', query)
+    query = _NUMBERS.sub('?', query)
+    query = _IN_LISTS.sub('(...)', query)
+    return _SPACES.sub(' ', query).strip()
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram.
+
+    Each bucket spans 5% of its lower bound, so percentiles are reported to
+    within about 5% in constant memory however many samples are recorded.
+    """
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    _SCALE = 1 / math.log(1.05)
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = math.floor(math.log(max(seconds, 1e-9)) * self._SCALE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(math.exp((index + 1) / self._SCALE), self.max)
+        return self.max
+
+
+class QueryStats:
+    """Per-normalized-statement latency histograms."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def add(self, query, seconds):
+        statement = normalize(query)
+        with self._lock:
+            histogram = self._histograms.get(statement)
+            if histogram is None:
+                histogram = self._histograms[statement] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def snapshot(self, sort='total_ms', top=None):
+        """
+        List of per-statement summaries (count, total, mean, p50/p95/p99,
+        max; times in milliseconds), largest `sort` first.
+        """
+        with self._lock:
+            rows = [{
+                'query': statement,
+                'count': h.count,
+                'total_ms': h.total * 1000,
+                'mean_ms': h.total / h.count * 1000,
+                'p50_ms': h.percentile(50) * 1000,
+                'p95_ms': h.percentile(95) * 1000,
+                'p99_ms': h.percentile(99) * 1000,
+                'max_ms': h.max * 1000,
+            } for statement, h in self._histograms.items()]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:top] if top else rows
+
+    def report(self, top=10):
+        """Slow-query report as text, statements costing the most time first."""
+        lines = [f"{'count':>8} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8}  statement"]
+        for row in self.snapshot(top=top):
+            lines.append(f"{row['count']:>8} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} "
+                         f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}  {row['query']}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def start_periodic_dump(self, interval=60.0, sink=None, top=10):
+        """
+        Write report() to sink every interval seconds on a daemon thread.
+
+        Returns:
+            threading.Event: set it to stop dumping.
+        """
+        stop = threading.Event()
+
+        def dump():
+            while not stop.wait(interval):
+                out = sink or sys.stdout
+                out.write(self.report(top) + '\n')
+                out.flush()
+
+        threading.Thread(target=dump, name='query-stats-dump', daemon=True).start()
+        return stop
+
+
+# Every QueryLog is drained by one shared writer thread, started with the
+# first log and stopped by a single atexit hook
+_logs = set()
+_logs_lock = threading.Lock()
+_writer = None
+_writer_wake = threading.Event()
+_writer_stop = False
+
+
+def _run_writer():
+    while not _writer_stop:
+        with _logs_lock:
+            logs = list(_logs)
+        now = time.monotonic()
+        wait = min((log._next_flush for log in logs), default=now + 1.0) - now
+        _writer_wake.wait(max(wait, 0.0))
+        _writer_wake.clear()
+        now = time.monotonic()
+        for log in logs:
+            if log._next_flush <= now or len(log._buffer) >= log.batch_size:
+                try:
+                    log.flush()
+                except Exception:
+                    # A broken sink loses its own batch, not the other logs'
+                    pass
+
+
+def _start_writer():
+    """Start the shared writer thread if it isn't running. Caller holds _logs_lock."""
+    global _writer
+    if _writer is None:
+        _writer = threading.Thread(target=_run_writer, name='query-log-writer', daemon=True)
+        _writer.start()
+        atexit.register(_close_all)
+
+
+def _close_all():
+    """Stop the writer and flush every open log."""
+    global _writer_stop
+    _writer_stop = True
+    _writer_wake.set()
+    if _writer is not None:
+        _writer.join()
+    with _logs_lock:
+        logs = list(_logs)
+    for log in logs:
+        log.close()
+
+
+class QueryLog:
+    """
+    Structured query log written by a background thread.
+
+    The caller's thread only timestamps the record and appends a tuple to
+    a bounded deque (atomic under the GIL, so no lock). One writer thread,
+    shared by every QueryLog, drains each deque every flush_interval
+    seconds, or as soon as batch_size records are waiting, and writes them
+    to `sink` as JSON lines in one write per batch. The encoding still
+    competes for the GIL: in 0-log_queries.py's benchmark a logged call
+    costs the caller about 3us, against 3.6us for print(), so sample_rate < 1
+    (the fraction of calls logged by decorators that don't set their own
+    rate) is what makes logging cheap on a hot path.
+
+    When the buffer is full the oldest records are dropped rather than
+    blocking the caller. `dropped` counts them, and an emitting log writes
+    a {"dropped": n} line for each batch of losses.
+
+    If `stats` is a QueryStats the writer also folds every record into its
+    histograms; with emit=False it only aggregates and writes nothing.
+    """
+
+    def __init__(self, sink=None, capacity=65536, batch_size=512, flush_interval=0.5,
+                 sample_rate=1.0, stats=None, emit=True):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1.")
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.stats = stats
+        self.emit = emit
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._drop_lock = threading.Lock()
+        self._buffer = deque(maxlen=capacity)
+        self._next_flush = time.monotonic() + flush_interval
+        self._write_lock = threading.Lock()
+        self._closed = False
+        with _logs_lock:
+            _logs.add(self)
+            _start_writer()
+        # Let the writer pick up this log's flush interval
+        _writer_wake.set()
+
+    def record(self, query, params, duration, rows, error=False):
+        """
+        Queue one query record; cheap enough for the hot path. A query that
+        raised is recorded with rows=None and error=True.
+        """
+        buffer = self._buffer
+        if len(buffer) == self.capacity:
+            # The append below pushes out the oldest record
+            with self._drop_lock:
+                self.dropped += 1
+        buffer.append((time.time(), query, params, duration, rows, error))
+        if len(buffer) == self.batch_size:
+            _writer_wake.set()
+
+    def flush(self):
+        """Write everything queued so far."""
+        with self._write_lock:
+            self._next_flush = time.monotonic() + self.flush_interval
+            dropped = self.dropped - self._reported_dropped
+            if dropped and self.emit:
+                self._reported_dropped += dropped
+                sink = self.sink or sys.stdout
+                sink.write(json.dumps({'ts': time.time(), 'dropped': dropped}) + '\n')
+                sink.flush()
+            while self._buffer:
+                lines = []
+                while self._buffer and len(lines) < self.batch_size:
+                    timestamp, query, params, duration, rows, error = self._buffer.popleft()
+                    if self.stats is not None:
+                        self.stats.add(query, duration)
+                    if not self.emit:
+                        lines.append(None)
+                        continue
+                    lines.append(json.dumps({
+                        'ts': timestamp,
+                        'query': query,
+                        'params': fingerprint(params),
+                        'duration_ms': round(duration * 1000, 3),
+                        'rows': rows,
+                        'error': error,
+                    }))
+                if self.emit:
+                    sink = self.sink or sys.stdout
+                    sink.write('\n'.join(lines) + '\n')
+                    sink.flush()
+
+    def close(self):
+        """Flush and detach from the shared writer."""
+        if not self._closed:
+            self._closed = True
+            with _logs_lock:
+                _logs.discard(self)
+            self.flush()
+
+
+_default_log = None
+_default_lock = threading.Lock()
+
+# Histograms fed by the default log
+default_stats = QueryStats()
+
+
+def default_log():
+    """Shared QueryLog writing to stdout, created on first use."""
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = QueryLog(stats=default_stats)
+        return _default_log
+
+
+def query_stats(sort='total_ms', top=None):
+    """
+    Per-statement latency summaries collected by the default log, flushing
+    pending records first so the numbers are current.
+    """
+    if _default_log is not None:
+        _default_log.flush()
+    return default_stats.snapshot(sort, top)
@@ -0,0 +1,208 @@
+import functools
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+
+class NamedQuery:
+    """
+    A registered SQL statement and its timing counters.
+
+    The first execution on each connection prepares (parses and plans) the
+    statement; later executions on that connection reuse it. Both are timed
+    separately, so prepare_ms - execute_ms estimates the parse/plan cost.
+    Calling it as query(conn, *params) runs it on conn.
+    """
+
+    __slots__ = ('name', 'sql', 'prepares', 'prepare_time', 'executions', 'execute_time')
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.prepares = 0
+        self.prepare_time = 0.0
+        self.executions = 0
+        self.execute_time = 0.0
+
+    def __call__(self, conn, *params):
+        prepared = getattr(conn, '_named_queries', None)
+        if prepared is not None and self.name in prepared:
+            cursor = prepared[self.name]
+            start = time.perf_counter()
+            if cursor is None:
+                # sqlite3 finds the text in the connection's statement cache
+                cursor = conn.execute(self.sql, params)
+            else:
+                cursor.execute(self.sql, params)
+            self.execute_time += time.perf_counter() - start
+            self.executions += 1
+            return cursor
+        return self._first_call(conn, prepared, params)
+
+    def _first_call(self, conn, prepared, params):
+        """Prepare on a connection that hasn't run this query yet."""
+        if prepared is None:
+            try:
+                prepared = conn._named_queries = {}  # name -> prepared cursor or None
+            except AttributeError:
+                # No attributes (a plain sqlite3.connect()): nothing to remember
+                start = time.perf_counter()
+                cursor = conn.execute(self.sql, params)
+                self.execute_time += time.perf_counter() - start
+                self.executions += 1
+                return cursor
+        start = time.perf_counter()
+        if isinstance(conn, sqlite3.Connection):
+            cursor = conn.execute(self.sql, params)
+            prepared[self.name] = None
+        else:
+            cursor = prepared[self.name] = conn.cursor(prepared=True)
+            cursor.execute(self.sql, params)
+        self.prepare_time += time.perf_counter() - start
+        self.prepares += 1
+        return cursor
+
+
+class QueryRegistry:
+    """
+    Named queries declared once and kept prepared per connection.
+
+    sqlite3 compiles a statement once per connection and keeps it in the
+    connection's statement cache (sized by the db_profile cached_statements
+    setting), keyed by the exact SQL text, so a plain cursor.execute() of
+    a constant string is already parsed only once; on sqlite3 the registry
+    adds its timing on top of that (about 2us per call) and is worth it
+    for the per-query report, not for speed. mysql-connector
+    connections instead get one prepared cursor (cursor(prepared=True)) per
+    query, so the server parses the statement once and later calls only
+    send parameters. A prepared cursor is reused, so fetch its rows before
+    running the same query again on that connection.
+
+    A call takes no lock and allocates nothing of its own: the
+    per-connection state lives in an attribute of the connection and the
+    counters are updated unlocked (two threads bumping the same counter at
+    once can rarely lose a count). Connections without attributes (a plain
+    sqlite3.connect(); db_profile.connect() returns one with them) still
+    work but all their calls count as executions.
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, sql):
+        """Declare a named query; re-registering the same text is a no-op."""
+        with self._lock:
+            query = self._queries.get(name)
+            if query is not None and query.sql != sql:
+                raise ValueError(f"Query {name!r} is already registered with different SQL.")
+            if query is None:
+                query = self._queries[name] = NamedQuery(name, sql)
+            return query
+
+    def execute(self, conn, name, params=()):
+        """Run a registered query on conn and return the cursor."""
+        return self._queries[name](conn, *params)
+
+    def query(self, name, sql):
+        """
+        Decorator registering `sql` as `name`.
+
+        The wrapped function is called as func(conn, query, *args), where
+        query(conn, *params) runs the prepared statement and returns its
+        cursor. Stack it under with_db_connection.
+        """
+        query = self.register(name, sql)
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(conn, *args, **kwargs):
+                return func(conn, query, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Per-query counts and mean prepare and execute times in milliseconds."""
+        with self._lock:
+            return [{
+                'query': q.name,
+                'prepares': q.prepares,
+                'prepare_ms': q.prepare_time / q.prepares * 1000 if q.prepares else None,
+                'executions': q.executions,
+                'execute_ms': q.execute_time / q.executions * 1000 if q.executions else None,
+            } for q in self._queries.values()]
+
+    def report(self):
+        """stats() as text, with the estimated parse/plan cost per query."""
+        lines = [f"{'prepares':>9} {'prepare ms':>11} {'executions':>11} "
+                 f"{'execute ms':>11} {'parse ms':>9}  query"]
+        for row in self.stats():
+            prepare, execute = row['prepare_ms'], row['execute_ms']
+            parse = prepare - execute if prepare is not None and execute is not None else None
+            lines.append(f"{row['prepares']:>9} {_ms(prepare):>11} {row['executions']:>11} "
+                         f"{_ms(execute):>11} {_ms(parse):>9}  {row['query']}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            for query in self._queries.values():
+                query.prepares = query.executions = 0
+                query.prepare_time = query.execute_time = 0.0
+
+
+def _ms(value):
+    return '-' if value is None else f"{value:.4f}"
+
+
+# Registry shared by the decorators in this directory
+default_registry = QueryRegistry()
+prepared_query = default_registry.query
+
+
+def benchmark(calls=100000):
+    """
+    Compare get_user_by_id run as a plain conn.execute() with the stock
+    statement cache, re-parsed on every call (cached_statements=0) and
+    through the registry, then print the registry's per-query report.
+    """
+    from db_profile import connect
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database = os.path.join(workdir, 'users.db')
+        conn = connect(database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         [(f"user{i}", f"user{i}@example.com") for i in range(1000)])
+        conn.commit()
+        conn.close()
+
+        registry = QueryRegistry()
+
+        @registry.query('get_user_by_id', "SELECT * FROM users WHERE id = ?")
+        def get_user_by_id(conn, query, user_id):
+            return query(conn, user_id).fetchone()
+
+        def plain(conn, user_id):
+            return conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+        results = {}
+        for label, fn, options in (('plain', plain, {}),
+                                   ('re-parsed', plain, {'cached_statements': 0}),
+                                   ('registry', get_user_by_id, {})):
+            conn = connect(database, **options)
+            start = time.perf_counter()
+            for i in range(calls):
+                fn(conn, i % 1000 + 1)
+            elapsed = time.perf_counter() - start
+            conn.close()
+            results[label] = calls / elapsed
+            print(f"{label:>10}: {results[label]:,.0f} calls/sec")
+        print(registry.report())
+    return results
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 4-cache_query.cache_query.
+"""
+
+import os
+import tempfile
+import unittest
+
+import db_profile
+from cache_store import QueryCache
+from fixtures import create_users, import_script
+
+cache = import_script('4-cache_query')
+transactional = import_script('2-transactional')
+
+
+class TestCacheQuery(unittest.TestCase):
+    """
+    Test class for 4-cache_query.cache_query.
+    """
+
+    def setUp(self) -> None:
+        """Create two databases holding different users."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.databases = []
+        for rows in (1, 2):
+            database = os.path.join(self.tmp.name, f'users{rows}.db')
+            create_users(database, rows)
+            self.databases.append(database)
+        self.store = QueryCache()
+
+        @cache.cache_query(cache=self.store)
+        def fetch(conn, query):
+            return conn.execute(query).fetchall()
+        self.fetch = fetch
+
+    def tearDown(self) -> None:
+        """Remove the databases."""
+        self.tmp.cleanup()
+
+    def test_keyed_by_connection_database(self) -> None:
+        """Test one function never mixes results of different databases."""
+        query = "SELECT COUNT(*) FROM users"
+        counts = []
+        for database in self.databases * 2:
+            conn = db_profile.connect(database)
+            counts.append(self.fetch(conn, query)[0][0])
+            conn.close()
+        self.assertEqual(counts, [1, 2, 1, 2])
+        self.assertEqual(self.store.stats()['hits'], 2)
+
+    def test_transactional_write_invalidates(self) -> None:
+        """Test a write through transactional drops cached reads of its table."""
+        conn = db_profile.connect(self.databases[0])
+
+        @transactional.transactional
+        def add_user(conn):
+            conn.execute("INSERT INTO users (name) VALUES ('new')")
+
+        query = "SELECT COUNT(*) FROM users"
+        self.assertEqual(self.fetch(conn, query), [(1,)])
+        add_user(conn)
+        self.assertEqual(self.fetch(conn, query), [(2,)])
+        conn.close()
+
+    def test_nested_transactional_keeps_outer_trace(self) -> None:
+        """Test a nested transactional call doesn't stop the outer one
+        tracing, so the outer call's later writes still invalidate."""
+        conn = db_profile.connect(self.databases[0])
+        query = "SELECT COUNT(*) FROM users"
+
+        @transactional.transactional
+        def inner(conn):
+            conn.execute("INSERT INTO users (name) VALUES ('inner')")
+
+        @transactional.transactional
+        def outer(conn):
+            inner(conn)
+            self.assertEqual(self.fetch(conn, query), [(2,)])
+            conn.execute("INSERT INTO users (name) VALUES ('outer')")
+
+        outer(conn)
+        self.assertEqual(self.fetch(conn, query), [(3,)])
+        self.assertFalse(transactional._traces)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
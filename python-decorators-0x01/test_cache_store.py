@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for cache_store.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import cache_store
+import db_profile
+from cache_store import (QueryCache, SharedQueryCache, SingleFlight,
+                         connection_database, forget_connection)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Test class for cache_store.SingleFlight.
+    """
+
+    def test_followers_share_result(self) -> None:
+        """Test concurrent callers share one execution and its result."""
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        results = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 42
+
+        leader = threading.Thread(target=lambda: results.append(flights.do('k', load)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flights.do('k', load)))
+                     for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(42, False)] + [(42, True)] * 3)
+        self.assertFalse(flights.in_flight('k'))
+
+    def test_followers_share_exception(self) -> None:
+        """Test callers waiting on a failing call get the same exception."""
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        error = ValueError("load failed")
+        errors = []
+
+        def load():
+            started.set()
+            release.wait(5)
+            raise error
+
+        def call():
+            try:
+                flights.do('k', load)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(errors), 3)
+        for e in errors:
+            self.assertIs(e, error)
+        self.assertFalse(flights.in_flight('k'))
+
+
+class TestConnectionDatabase(unittest.TestCase):
+    """
+    Test class for cache_store.connection_database.
+    """
+
+    def setUp(self) -> None:
+        """Create an empty database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        sqlite3.connect(self.database).close()
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def test_file_identity(self) -> None:
+        """Test plain and profile connections to a file share its path."""
+        plain = sqlite3.connect(self.database)
+        profiled = db_profile.connect(self.database)
+        self.assertEqual(connection_database(plain), self.database)
+        self.assertEqual(connection_database(profiled), self.database)
+        forget_connection(plain)
+        plain.close()
+        profiled.close()
+
+    def test_pragma_runs_once_on_plain_connection(self) -> None:
+        """Test a plain connection's identity is cached after one PRAGMA."""
+        conn = sqlite3.connect(self.database)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        for _ in range(3):
+            connection_database(conn)
+        self.assertEqual(len(statements), 1)
+        forget_connection(conn)
+        connection_database(conn)
+        self.assertEqual(len(statements), 2)
+        forget_connection(conn)
+        conn.close()
+
+    def test_memory_connections_differ(self) -> None:
+        """Test each in-memory connection gets an identity of its own."""
+        first, second = sqlite3.connect(':memory:'), sqlite3.connect(':memory:')
+        self.assertNotEqual(connection_database(first), connection_database(second))
+        self.assertEqual(connection_database(first), connection_database(first))
+        for conn in (first, second):
+            forget_connection(conn)
+            conn.close()
+
+    def test_plain_connections_evicted(self) -> None:
+        """Test plain connections beyond the limit are evicted oldest first."""
+        with patch.object(cache_store, 'MAX_PLAIN_CONNECTIONS', 2):
+            conns = [sqlite3.connect(self.database) for _ in range(3)]
+            for conn in conns:
+                connection_database(conn)
+            held = [entry[0] for entry in cache_store._plain_ids.values()]
+        self.assertNotIn(conns[0], held)
+        self.assertIn(conns[2], held)
+        for conn in conns:
+            forget_connection(conn)
+            conn.close()
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    Test class for cache_store.QueryCache.
+    """
+
+    @staticmethod
+    def key(user_id: int) -> tuple:
+        """Cache key of a users lookup."""
+        return QueryCache.make_key('users.db', "SELECT * FROM users WHERE id = ?", (user_id,))
+
+    def test_lru_eviction(self) -> None:
+        """Test the least recently used entry goes first past max_entries."""
+        cache = QueryCache(max_entries=2)
+        cache.set(self.key(1), 'one')
+        cache.set(self.key(2), 'two')
+        cache.get(self.key(1))
+        cache.set(self.key(3), 'three')
+        self.assertEqual(cache.get(self.key(2)), (False, None))
+        self.assertEqual(cache.get(self.key(1)), (True, 'one'))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl_expiry(self) -> None:
+        """Test an expired entry misses, unless it is within the grace period."""
+        cache = QueryCache()
+        cache.set(self.key(1), 'one', ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup(self.key(1), grace=60), (True, 'one', True))
+        self.assertEqual(cache.get(self.key(1)), (False, None))
+        self.assertEqual(cache.expirations, 1)
+
+    def test_oversized_value_drops_old_entry(self) -> None:
+        """Test rejecting a value over max_bytes also drops the key's old value."""
+        cache = QueryCache(max_bytes=1024)
+        cache.set(self.key(1), 'one')
+        self.assertFalse(cache.set(self.key(1), 'x' * 2048))
+        self.assertEqual(cache.get(self.key(1)), (False, None))
+
+    def test_invalidation_during_load_refuses_set(self) -> None:
+        """Test a result loaded across an invalidation of its table isn't stored."""
+        cache = QueryCache()
+        generation = cache.generation(self.key(1))
+        cache.invalidate_tables('users.db', ['users'])
+        self.assertFalse(cache.set(self.key(1), 'stale', generation=generation))
+        self.assertEqual(cache.get(self.key(1)), (False, None))
+        self.assertTrue(cache.set(self.key(1), 'fresh', generation=cache.generation(self.key(1))))
+        self.assertEqual(cache.get(self.key(1)), (True, 'fresh'))
+
+    def test_other_table_invalidation_allows_set(self) -> None:
+        """Test an invalidation of an unrelated table doesn't refuse the set."""
+        cache = QueryCache()
+        generation = cache.generation(self.key(1))
+        cache.invalidate_tables('users.db', ['orders'])
+        self.assertTrue(cache.set(self.key(1), 'one', generation=generation))
+
+    def test_shared_cache_refuses_stale_load(self) -> None:
+        """Test SharedQueryCache keeps generations in its file, across instances."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            loader, writer = SharedQueryCache(path), SharedQueryCache(path)
+            generation = loader.generation(self.key(1))
+            writer.invalidate_tables('users.db', ['users'])
+            self.assertFalse(loader.set(self.key(1), 'stale', generation=generation))
+            self.assertEqual(loader.get(self.key(1)), (False, None))
+            self.assertTrue(loader.set(self.key(1), 'fresh',
+                                       generation=loader.generation(self.key(1))))
+            self.assertEqual(writer.get(self.key(1)), (True, 'fresh'))
+
+
+class TestSharedQueryCache(unittest.TestCase):
+    """
+    Test class for cache_store.SharedQueryCache.
+    """
+
+    key = staticmethod(TestQueryCache.key)
+
+    def setUp(self) -> None:
+        """A cache file in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.db')
+
+    def tearDown(self) -> None:
+        """Remove the cache file."""
+        self.tmp.cleanup()
+
+    def test_round_trip_across_instances(self) -> None:
+        """Test small and compressed values read back from another instance."""
+        writer = SharedQueryCache(self.path, compress_over=64)
+        rows = [(i, f"user{i}") for i in range(100)]
+        writer.set(self.key(1), [(1, 'one')])
+        writer.set(self.key(2), rows)
+        reader = SharedQueryCache(self.path)
+        self.assertEqual(reader.get(self.key(1)), (True, [(1, 'one')]))
+        self.assertEqual(reader.get(self.key(2)), (True, rows))
+        self.assertEqual(reader.get(self.key(3)), (False, None))
+        self.assertEqual((reader.hits, reader.misses), (2, 1))
+
+    def test_lru_eviction(self) -> None:
+        """Test the least recently touched entry goes first past max_entries."""
+        cache = SharedQueryCache(self.path, max_entries=2, touch_interval=0)
+        cache.set(self.key(1), 'one')
+        time.sleep(0.01)
+        cache.set(self.key(2), 'two')
+        time.sleep(0.01)
+        cache.get(self.key(1))
+        cache.set(self.key(3), 'three')
+        self.assertEqual(cache.get(self.key(2)), (False, None))
+        self.assertEqual(cache.get(self.key(1)), (True, 'one'))
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+
+    def test_ttl_expiry(self) -> None:
+        """Test an expired entry misses, unless it is within the grace period."""
+        cache = SharedQueryCache(self.path)
+        cache.set(self.key(1), 'one', ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup(self.key(1), grace=60), (True, 'one', True))
+        self.assertEqual(cache.get(self.key(1)), (False, None))
+        self.assertEqual((len(cache), cache.expirations), (0, 1))
+
+    def test_invalidate_writes(self) -> None:
+        """Test a write drops entries reading its table and keeps the rest."""
+        cache = SharedQueryCache(self.path)
+        other = QueryCache.make_key('users.db', "SELECT * FROM orders", ())
+        cache.set(self.key(1), 'one')
+        cache.set(other, 'orders')
+        cache_store.invalidate_writes('users.db', ["UPDATE users SET age = 1"])
+        self.assertEqual(cache.get(self.key(1)), (False, None))
+        self.assertEqual(cache.get(other), (True, 'orders'))
+        self.assertEqual(cache.invalidations, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for db_pool.ConnectionPool.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import db_pool
+from fixtures import create_users
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Test class for db_pool.ConnectionPool.
+    """
+
+    def setUp(self) -> None:
+        """Create a pool of at most two connections."""
+        self.tmp = tempfile.TemporaryDirectory()
+        database = os.path.join(self.tmp.name, 'users.db')
+        create_users(database)
+        self.pool = db_pool.ConnectionPool(database, min_size=0, max_size=2,
+                                           checkout_timeout=0.1)
+
+    def tearDown(self) -> None:
+        """Close the pool and remove the database."""
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_nested_checkouts_share_connection(self) -> None:
+        """Test nested checkouts on one thread get the same connection."""
+        with self.pool.connection() as outer:
+            with self.pool.connection() as inner:
+                self.assertIs(inner, outer)
+        with self.pool.connection() as again:
+            self.assertIs(again, outer)
+
+    def test_max_size_times_out(self) -> None:
+        """Test a checkout waits for a free connection and then times out."""
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with self.pool.connection():
+                held.set()
+                release.wait(5)
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            held.clear()
+            thread.start()
+            held.wait(5)
+        with self.assertRaises(db_pool.PoolTimeout):
+            self.pool.acquire()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (3,))
+
+    def test_uncommitted_work_rolled_back(self) -> None:
+        """Test a connection comes back without the last holder's transaction."""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM users")
+        with self.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (3,))
+
+    def test_connect_runs_outside_lock(self) -> None:
+        """Test a slow connect doesn't block other threads using the pool."""
+        connecting, finish = threading.Event(), threading.Event()
+        connect = self.pool._connect
+
+        def slow_connect():
+            connecting.set()
+            finish.wait(5)
+            return connect()
+
+        with patch.object(self.pool, '_connect', slow_connect):
+            opener = threading.Thread(target=lambda: self.pool.release(self.pool.acquire()))
+            opener.start()
+            connecting.wait(5)
+            self.assertTrue(self.pool._lock.acquire(timeout=1))
+            self.pool._lock.release()
+            self.assertEqual(self.pool.stats()['size'], 1)
+            finish.set()
+            opener.join(5)
+        self.assertEqual(self.pool.stats(), {'size': 1, 'idle': 1, 'in_use': 0})
+
+    def test_failed_connect_frees_slot(self) -> None:
+        """Test a connect that raises gives its reserved slot back."""
+        with patch.object(self.pool, '_connect', side_effect=OSError("refused")):
+            for _ in range(3):
+                with self.assertRaises(OSError):
+                    self.pool.acquire()
+        self.assertEqual(self.pool.stats()['size'], 0)
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (3,))
+
+    def test_unhealthy_connection_replaced(self) -> None:
+        """Test a stale connection failing its ping is replaced in its slot."""
+        self.pool.health_check_interval = 0
+        with self.pool.connection() as first:
+            pass
+        first.close()
+        with self.pool.connection() as conn:
+            self.assertIsNot(conn, first)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone(), (3,))
+        self.assertEqual(self.pool.stats()['size'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for db_profile.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+import weakref
+from contextlib import redirect_stdout
+
+import db_profile
+
+
+class TestDbProfile(unittest.TestCase):
+    """
+    Test class for db_profile profiles, connect() and benchmark().
+    """
+
+    def setUp(self) -> None:
+        """A database file in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+
+    def tearDown(self) -> None:
+        """Remove the database file."""
+        self.tmp.cleanup()
+
+    def pragma(self, conn, name: str):
+        """Current value of a PRAGMA."""
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_default_profile_is_stock(self) -> None:
+        """Test the default profile leaves sqlite's journal and sync settings alone."""
+        conn = db_profile.connect(self.database, 'default')
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 2)
+        conn.close()
+
+    def test_tuned_profile_pragmas(self) -> None:
+        """Test the tuned profile switches to WAL with synchronous=NORMAL."""
+        conn = db_profile.connect(self.database, 'tuned')
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)
+        self.assertEqual(self.pragma(conn, 'cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma(conn, 'temp_store'), 2)
+        conn.close()
+
+    def test_connection_is_weakly_referenceable(self) -> None:
+        """Test connect() returns a Connection a WeakKeyDictionary can key on."""
+        conn = db_profile.connect(':memory:')
+        self.assertIsInstance(conn, db_profile.Connection)
+        weakref.ref(conn)
+        conn.close()
+
+    def test_unknown_profile(self) -> None:
+        """Test naming a missing profile raises ValueError listing the choices."""
+        with self.assertRaisesRegex(ValueError, 'durable'):
+            db_profile.connect(':memory:', 'missing')
+
+    def test_register_profile(self) -> None:
+        """Test a registered profile's PRAGMAs and settings are applied."""
+        db_profile.register_profile('small', [('cache_size', -512)], timeout=0.5)
+        self.addCleanup(db_profile.PROFILES.pop, 'small')
+        self.assertEqual(db_profile.pragma_statements('small'), ["PRAGMA cache_size=-512"])
+        conn = db_profile.connect(':memory:', 'small')
+        self.assertEqual(self.pragma(conn, 'cache_size'), -512)
+        conn.close()
+
+    def test_benchmark(self) -> None:
+        """Test benchmark() reports reads and writes for each profile."""
+        with redirect_stdout(io.StringIO()) as out:
+            results = db_profile.benchmark(('default', 'tuned'), readers=1, seconds=0.2,
+                                           rows=100)
+        self.assertEqual(set(results), {'default', 'tuned'})
+        for name in results:
+            self.assertGreater(results[name]['reads'], 0)
+            self.assertIn(name, out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
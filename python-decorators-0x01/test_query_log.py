@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for query_log (QueryLog, QueryStats,
+LatencyHistogram, normalize) and the structured mode of
+0-log_queries.log_queries.
+"""
+
+import io
+import json
+import threading
+import time
+import unittest
+
+import query_log
+from fixtures import import_script
+from query_log import LatencyHistogram, QueryLog, QueryStats, normalize
+
+log_queries = import_script('0-log_queries').log_queries
+
+
+class TestQueryLog(unittest.TestCase):
+    """
+    Test class for query_log.QueryLog.
+    """
+
+    def setUp(self) -> None:
+        """A log that only writes when flushed."""
+        self.sink = io.StringIO()
+        self.log = QueryLog(sink=self.sink, flush_interval=60, batch_size=1000)
+
+    def tearDown(self) -> None:
+        """Close the log."""
+        self.log.close()
+
+    def lines(self) -> list:
+        """Flush the log and parse what it wrote."""
+        self.log.flush()
+        return [json.loads(line) for line in self.sink.getvalue().splitlines()]
+
+    def test_record_fields(self) -> None:
+        """Test a record keeps the query and duration but not the parameter values."""
+        self.log.record("SELECT * FROM users WHERE id = ?", (1,), 0.0025, 1)
+        self.log.record("SELECT nope", (), 0.001, None, error=True)
+        first, second = self.lines()
+        self.assertEqual((first['query'], first['duration_ms'], first['rows'], first['error']),
+                         ("SELECT * FROM users WHERE id = ?", 2.5, 1, False))
+        self.assertEqual(first['params'], query_log.fingerprint((1,)))
+        self.assertIsNone(second['params'])
+        self.assertTrue(second['error'])
+
+    def test_full_buffer_counts_drops(self) -> None:
+        """Test records pushed out of a full buffer are counted and reported."""
+        log = QueryLog(sink=self.sink, capacity=2, flush_interval=60)
+        self.addCleanup(log.close)
+        for i in range(5):
+            log.record(f"SELECT {i}", (), 0.001, 0)
+        self.assertEqual(log.dropped, 3)
+        log.flush()
+        lines = [json.loads(line) for line in self.sink.getvalue().splitlines()]
+        self.assertEqual(lines[0]['dropped'], 3)
+        self.assertEqual([line['query'] for line in lines[1:]], ["SELECT 3", "SELECT 4"])
+        log.flush()
+        self.assertEqual(len(self.sink.getvalue().splitlines()), 3)
+
+    def test_one_writer_for_all_logs(self) -> None:
+        """Test every log is drained by the same writer thread."""
+        logs = [QueryLog(sink=io.StringIO(), flush_interval=0.01) for _ in range(3)]
+        for log in logs:
+            self.addCleanup(log.close)
+            log.record("SELECT 1", (), 0.001, 1)
+        writers = [thread for thread in threading.enumerate()
+                   if thread.name == 'query-log-writer']
+        self.assertEqual(len(writers), 1)
+        deadline = time.monotonic() + 5
+        while any(log._buffer for log in logs) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(all(log.sink.getvalue() for log in logs))
+
+    def test_batch_size_wakes_writer(self) -> None:
+        """Test a full batch is written without waiting for flush_interval."""
+        log = QueryLog(sink=io.StringIO(), flush_interval=60, batch_size=4)
+        self.addCleanup(log.close)
+        for _ in range(4):
+            log.record("SELECT 1", (), 0.001, 1)
+        deadline = time.monotonic() + 5
+        while log._buffer and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(log.sink.getvalue().splitlines()), 4)
+
+    def test_structured_decorator(self) -> None:
+        """Test log_queries(structured=True) records calls, failures included."""
+        @log_queries(structured=True, log=self.log)
+        def run(query, *params):
+            if query == "fail":
+                raise ValueError(query)
+            return [params]
+
+        run("SELECT ?", 1)
+        with self.assertRaises(ValueError):
+            run("fail")
+        first, second = self.lines()
+        self.assertEqual((first['query'], first['rows'], first['error']), ("SELECT ?", 1, False))
+        self.assertEqual((second['query'], second['rows'], second['error']), ("fail", None, True))
+
+    def test_sampling(self) -> None:
+        """Test sample_rate=0 logs nothing but still runs the function."""
+        calls = []
+        run = log_queries(structured=True, sample_rate=0, log=self.log)(calls.append)
+        for i in range(10):
+            run(i)
+        self.assertEqual(len(calls), 10)
+        self.assertEqual(self.lines(), [])
+
+
+class TestQueryStats(unittest.TestCase):
+    """
+    Test class for query_log.QueryStats, LatencyHistogram and normalize.
+    """
+
+    def test_normalize(self) -> None:
+        """Test literals, comments, IN lists and spacing are normalized away."""
+        self.assertEqual(
+            normalize("SELECT * FROM users  -- lookup\nWHERE name = 'O''Neil' "
+                      "AND age > 30 AND id IN (1, 2, 3) /* hint */ AND t1.x = 1.5e3"),
+            "SELECT * FROM users WHERE name = ? AND age > ? AND id IN (...) AND t1.x = ?")
+        self.assertEqual(normalize("SELECT * FROM users WHERE id IN (?, ?)"),
+                         "SELECT * FROM users WHERE id IN (...)")
+
+    def test_histogram_percentiles(self) -> None:
+        """Test percentiles land within the 5% bucket width of the exact ones."""
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for ms in range(1, 1001):
+            histogram.add(ms / 1000)
+        for p in (50, 95, 99):
+            exact = p / 100
+            self.assertGreaterEqual(histogram.percentile(p), exact)
+            self.assertLessEqual(histogram.percentile(p), exact * 1.05)
+        self.assertEqual(histogram.percentile(100), 1.0)
+        self.assertEqual((histogram.count, histogram.max), (1000, 1.0))
+
+    def test_statements_grouped_and_sorted(self) -> None:
+        """Test queries differing in literals share a row, costliest first."""
+        stats = QueryStats()
+        for user_id in range(10):
+            stats.add(f"SELECT * FROM users WHERE id = {user_id}", 0.001)
+        stats.add("DELETE FROM users", 0.5)
+        rows = stats.snapshot()
+        self.assertEqual([row['query'] for row in rows],
+                         ["DELETE FROM users", "SELECT * FROM users WHERE id = ?"])
+        self.assertEqual(rows[1]['count'], 10)
+        self.assertAlmostEqual(rows[1]['total_ms'], 10)
+        self.assertEqual(stats.snapshot(sort='count', top=1)[0]['count'], 10)
+        self.assertEqual(len(stats.report().splitlines()), 3)
+        stats.reset()
+        self.assertEqual(stats.snapshot(), [])
+
+    def test_log_feeds_stats(self) -> None:
+        """Test a non-emitting log only aggregates its records."""
+        stats, sink = QueryStats(), io.StringIO()
+        log = QueryLog(sink=sink, flush_interval=60, stats=stats, emit=False)
+        log.record("SELECT 1", (), 0.002, 1)
+        log.record("SELECT 2", (), 0.004, 1)
+        log.close()
+        self.assertEqual(sink.getvalue(), '')
+        row, = stats.snapshot()
+        self.assertEqual((row['query'], row['count']), ("SELECT ?", 2))
+        self.assertAlmostEqual(row['max_ms'], 4)
+
+    def test_periodic_dump(self) -> None:
+        """Test the dump thread writes reports until stopped."""
+        stats, sink = QueryStats(), io.StringIO()
+        stats.add("SELECT 1", 0.001)
+        stop = stats.start_periodic_dump(interval=0.01, sink=sink)
+        time.sleep(0.1)
+        stop.set()
+        self.assertIn("SELECT ?", sink.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
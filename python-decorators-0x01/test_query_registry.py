@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for query_registry.QueryRegistry.
+"""
+
+import sqlite3
+import unittest
+from unittest.mock import Mock
+
+import db_profile
+from query_registry import QueryRegistry
+
+
+class TestQueryRegistry(unittest.TestCase):
+    """
+    Test class for query_registry.QueryRegistry.
+    """
+
+    def setUp(self) -> None:
+        """Register one query on a fresh registry."""
+        self.registry = QueryRegistry()
+        self.registry.register('double', "SELECT ? * 2")
+
+    def stats(self) -> dict:
+        """Stats of the registered query."""
+        return self.registry.stats()[0]
+
+    def test_register_conflict(self) -> None:
+        """Test re-registering a name with different SQL raises ValueError."""
+        self.registry.register('double', "SELECT ? * 2")
+        with self.assertRaises(ValueError):
+            self.registry.register('double', "SELECT ? * 3")
+
+    def test_prepares_once_per_connection(self) -> None:
+        """Test the first call on each connection counts as its prepare."""
+        for _ in range(2):
+            conn = db_profile.connect(':memory:')
+            for value in range(3):
+                self.assertEqual(
+                    self.registry.execute(conn, 'double', (value,)).fetchone(),
+                    (value * 2,))
+            conn.close()
+        stats = self.stats()
+        self.assertEqual((stats['prepares'], stats['executions']), (2, 4))
+
+    def test_plain_connection_counts_executions(self) -> None:
+        """Test a connection without attributes still runs the query."""
+        conn = sqlite3.connect(':memory:')
+        self.assertEqual(self.registry.execute(conn, 'double', (4,)).fetchone(), (8,))
+        conn.close()
+        self.assertEqual((self.stats()['prepares'], self.stats()['executions']), (0, 1))
+
+    def test_decorator_passes_query(self) -> None:
+        """Test a decorated function gets the query after the connection."""
+        @self.registry.query('triple', "SELECT ? * 3")
+        def triple(conn, query, value):
+            return query(conn, value).fetchone()[0]
+
+        conn = db_profile.connect(':memory:')
+        self.assertEqual(triple(conn, 5), 15)
+        conn.close()
+
+    def test_mysql_prepared_cursor_reused(self) -> None:
+        """Test a non-sqlite3 connection gets one prepared cursor per query."""
+        conn = Mock(spec=['cursor'])
+        for value in range(3):
+            self.registry.execute(conn, 'double', (value,))
+        conn.cursor.assert_called_once_with(prepared=True)
+        self.assertEqual(conn.cursor.return_value.execute.call_count, 3)
+
+    def test_report(self) -> None:
+        """Test report() has a header and one line per query."""
+        conn = db_profile.connect(':memory:')
+        self.registry.execute(conn, 'double', (1,))
+        conn.close()
+        lines = self.registry.report().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith('double'))
+
+
+if __name__ == '__main__':
+    unittest.main()
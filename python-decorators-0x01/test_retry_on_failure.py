@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 3-retry_on_failure.
+"""
+
+import io
+import sqlite3
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import import_script
+
+retry = import_script('3-retry_on_failure')
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test class for 3-retry_on_failure.CircuitBreaker with retry_on_failure.
+    """
+
+    def setUp(self) -> None:
+        """Open a breaker that allows a trial call after 50ms."""
+        self.breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        self.breaker.record_failure()
+
+    def call(self, error: BaseException = None):
+        """Call through the breaker, raising error if given."""
+        @retry.retry_on_failure(retries=1, breaker=self.breaker)
+        def operation():
+            if error is not None:
+                raise error
+            return 'ok'
+        with redirect_stdout(io.StringIO()):
+            return operation()
+
+    def test_open_fails_fast(self) -> None:
+        """Test an open circuit raises CircuitOpenError without calling."""
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(retry.CircuitOpenError):
+            self.call()
+
+    def test_half_open_recovery(self) -> None:
+        """Test a successful trial call closes the circuit."""
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertEqual(self.call(), 'ok')
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_failed_trial_reopens(self) -> None:
+        """Test a transient failure during the trial opens the circuit again."""
+        time.sleep(0.06)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.call(sqlite3.OperationalError("database is locked"))
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_interrupted_trial_is_released(self) -> None:
+        """Test a trial ended by a non-transient error or BaseException
+        never blocks the next call."""
+        for error in (KeyboardInterrupt(), ValueError("not transient")):
+            self.breaker.record_failure()
+            time.sleep(0.06)
+            with self.assertRaises(type(error)):
+                self.call(error)
+            self.assertEqual(self.call(), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 2-transactional.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import db_profile
+from fixtures import import_script
+
+transactional = import_script('2-transactional')
+
+
+class TestGroupCommitter(unittest.TestCase):
+    """
+    Test class for 2-transactional.GroupCommitter.
+    """
+
+    def setUp(self) -> None:
+        """Start a committer on a fresh database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'writes.db')
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT, "
+                     "parent INTEGER REFERENCES parent(id) "
+                     "DEFERRABLE INITIALLY DEFERRED)")
+        conn.commit()
+        conn.close()
+        db_profile.register_profile('foreign_keys', (('foreign_keys', 'ON'),))
+        self.committer = transactional.GroupCommitter(
+            self.database, profile='foreign_keys')
+
+    def tearDown(self) -> None:
+        """Stop the committer and remove the database."""
+        self.committer.close()
+        del db_profile.PROFILES['foreign_keys']
+        self.tmp.cleanup()
+
+    def values(self) -> list:
+        """Committed item values, in insertion order."""
+        conn = sqlite3.connect(self.database)
+        try:
+            return [row[0] for row in
+                    conn.execute("SELECT value FROM items ORDER BY id")]
+        finally:
+            conn.close()
+
+    def submit_batch(self, *writes) -> list:
+        """
+        Submit writes while the writer is held up, so they share a batch,
+        and return their futures.
+        """
+        gate = threading.Event()
+        self.committer.submit(lambda conn: gate.wait(5))
+        futures = [self.committer.submit(write) for write in writes]
+        gate.set()
+        for future in futures:
+            future.exception(5)
+        return futures
+
+    @staticmethod
+    def insert(value: str, parent: int = None):
+        """A write inserting one item."""
+        def write(conn):
+            return conn.execute("INSERT INTO items (value, parent) VALUES (?, ?)",
+                                (value, parent)).lastrowid
+        return write
+
+    def test_failed_write_rolls_back_alone(self) -> None:
+        """Test a write that raises fails alone and the batch commits."""
+        def fail(conn):
+            conn.execute("INSERT INTO items (value) VALUES ('lost')")
+            raise ValueError("bad write")
+
+        first, failed, last = self.submit_batch(
+            self.insert('a'), fail, self.insert('b'))
+        self.assertIsInstance(failed.exception(), ValueError)
+        self.assertIsNone(first.exception())
+        self.assertIsNone(last.exception())
+        self.assertEqual(self.values(), ['a', 'b'])
+
+    def test_commit_failure_fails_batch(self) -> None:
+        """Test a failing COMMIT fails every write and the writer recovers."""
+        futures = self.submit_batch(self.insert('a'), self.insert('orphan', 99))
+        for future in futures:
+            self.assertIsInstance(future.exception(), sqlite3.IntegrityError)
+        self.assertEqual(self.values(), [])
+        self.committer.submit(self.insert('c')).result(5)
+        self.assertEqual(self.values(), ['c'])
+
+    def test_write_ending_transaction_fails_batch(self) -> None:
+        """Test a write that commits by itself fails the batch, not the writer."""
+        futures = self.submit_batch(self.insert('a'), lambda conn: conn.commit())
+        for future in futures:
+            self.assertIsInstance(future.exception(), sqlite3.OperationalError)
+        self.assertEqual(self.committer.submit(self.insert('c')).result(5), 2)
+
+    def test_base_exception_fails_batch(self) -> None:
+        """Test a BaseException from a write fails the batch and rolls back."""
+        def interrupt(conn):
+            raise SystemExit()
+
+        futures = self.submit_batch(self.insert('a'), interrupt, self.insert('b'))
+        for future in futures:
+            self.assertIsInstance(future.exception(), SystemExit)
+        self.assertEqual(self.values(), [])
+        self.committer.submit(self.insert('c')).result(5)
+        self.assertEqual(self.values(), ['c'])
+
+    def test_submit_after_close(self) -> None:
+        """Test submit raises RuntimeError once the committer is closed."""
+        self.committer.close()
+        with self.assertRaises(RuntimeError):
+            self.committer.submit(self.insert('a'))
+
+    def test_submit_after_writer_died(self) -> None:
+        """Test submit raises RuntimeError when the writer could not start."""
+        with patch('threading.excepthook'):
+            committer = transactional.GroupCommitter(
+                os.path.join(self.tmp.name, 'missing', 'writes.db'))
+            committer._thread.join(5)
+        with self.assertRaises(RuntimeError):
+            committer.submit(self.insert('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,26 +1,97 @@
 #!/usr/bin/python3
+import sys
+import time
+import tracemalloc
+
 import mysql.connector
 
-def stream_users():
-    """Generator that yields one user row at a time as a dictionary"""
-    try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="your_password",  # Replace with your actual MySQL root password
-            database="ALX_prodev"
-        )
+import seed
+
+
+def connect():
+    """Open a connection to the ALX_prodev database"""
+    return mysql.connector.connect(
+        host="localhost",
+        user="root",
+        password="your_password",  # Replace with your actual MySQL root password
+        database="ALX_prodev"
+    )
+
+
+def stream_users(prefetch=None, connection=None):
+    """Generator that yields one user row at a time as a dictionary
+
+    Args:
+        prefetch (int): When set, rows are streamed from the server with an
+                        unbuffered cursor and read prefetch rows at a time
+                        with fetchmany(), so client memory stays bounded by
+                        prefetch regardless of the table size. When None the
+                        default cursor is iterated.
+        connection: Optional open connection to read from. It is left open;
+                    by default a new connection is opened and closed.
+    """
+    if prefetch is not None and (not isinstance(prefetch, int) or prefetch <= 0):
+        raise ValueError("prefetch must be a positive integer.")
 
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+    own_connection = connection is None
+    cursor = None
+    try:
+        if own_connection:
+            connection = connect()
 
-        for row in cursor:
-            yield row
+        if prefetch is None:
+            cursor = seed.dict_cursor(connection)
+            cursor.execute("SELECT * FROM user_data")
+            for row in cursor:
+                yield row
+        else:
+            cursor = seed.dict_cursor(connection, buffered=False)
+            cursor.execute("SELECT * FROM user_data")
+            while True:
+                rows = cursor.fetchmany(prefetch)
+                if not rows:
+                    break
+                yield from rows
 
     except mysql.connector.Error as err:
         print(f"Error: {err}")
     finally:
         if cursor:
-            cursor.close()
-        if connection:
+            seed.close_cursor(cursor, None if own_connection else connection)
+        if own_connection and connection:
             connection.close()
+
+
+def benchmark(connect=connect, prefetch=1000):
+    """Compare the default cursor with prefetch streaming.
+
+    Reports time to first row, rows/sec and peak Python heap usage
+    (tracemalloc) for a full scan of user_data.
+    """
+    results = {}
+    for label, size in (("default", None), (f"prefetch={prefetch}", prefetch)):
+        connection = connect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        first_row = None
+        count = 0
+        for _ in stream_users(prefetch=size, connection=connection):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            count += 1
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        connection.close()
+
+        results[label] = {"rows": count, "first_row": first_row or 0.0,
+                          "rows_per_sec": count / elapsed if elapsed else 0.0,
+                          "peak_bytes": peak}
+        print(f"{label:>15}: first row {results[label]['first_row'] * 1000:.1f}ms, "
+              f"{results[label]['rows_per_sec']:.0f} rows/sec, "
+              f"peak {peak / 1024:.0f} KiB")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(prefetch=int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -1,3 +1,15 @@
+import operator
+import sys
+import time
+import tracemalloc
+from array import array
+from itertools import compress, repeat
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the array module is the fallback
+    np = None
+
 # --- Simulated User Database Table ---
 # This list simulates a table, which we'll conceptually call 'user_data_table'.
 # In a real-world application, this data would typically be fetched from an actual database.
@@ -6,8 +18,105 @@ user_data_table = [
     for i in range(1, 51) # Create 50 mock user records
 ]
 
+# Comparison operators a columnar predicate may use
+_OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+    '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+# --- Columnar batch representation ---
+class ColumnarBatch:
+    """
+    A batch of rows stored column by column instead of as a list of dicts.
+
+    Integer and float columns are packed into typed arrays (NumPy arrays when
+    NumPy is installed, otherwise array.array), and string columns hold
+    interned strings, so repeated values share one object. A predicate
+    such as `batch.where('age', '>', 25)` compares a whole column at once
+    instead of doing one dict lookup per row.
+    """
+
+    __slots__ = ('columns', 'length')
+
+    def __init__(self, columns, length):
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_columns(cls, **values):
+        """Build a batch from equally long sequences, one per column."""
+        columns = {name: _pack(column) for name, column in values.items()}
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length.")
+        return cls(columns, lengths.pop() if lengths else 0)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a batch from a list of row dictionaries."""
+        if not rows:
+            return cls({}, 0)
+        return cls.from_columns(**{name: [row[name] for row in rows] for name in rows[0]})
+
+    def __len__(self):
+        return self.length
+
+    def mask(self, column, op, value):
+        """Evaluate `column op value` for every row in one pass."""
+        compare = _OPERATORS[op]
+        values = self.columns[column]
+        if np is not None and isinstance(values, np.ndarray):
+            return compare(values, value)
+        return list(map(compare, values, repeat(value)))
+
+    def filter(self, mask):
+        """Return a new batch holding only the rows where mask is true."""
+        if np is not None and isinstance(mask, np.ndarray):
+            columns = {name: column[mask] if isinstance(column, np.ndarray)
+                       else list(compress(column, mask))
+                       for name, column in self.columns.items()}
+            return ColumnarBatch(columns, int(mask.sum()))
+        columns = {name: _take(column, mask) for name, column in self.columns.items()}
+        return ColumnarBatch(columns, sum(mask))
+
+    def where(self, column, op, value):
+        """Shortcut for filter(mask(column, op, value))."""
+        return self.filter(self.mask(column, op, value))
+
+    def rows(self):
+        """Yield the batch back as row dictionaries."""
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield {name: _scalar(value) for name, value in zip(names, values)}
+
+
+def _pack(values):
+    """Store a column as a typed array, or as interned strings."""
+    values = list(values)
+    if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return np.asarray(values, dtype=np.int64) if np is not None else array('q', values)
+    if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return np.asarray(values, dtype=np.float64) if np is not None else array('d', values)
+    values = [sys.intern(v) if isinstance(v, str) else v for v in values]
+    if np is not None:
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return values
+
+
+def _take(column, mask):
+    """Keep the items of a non-NumPy column where mask is true."""
+    kept = compress(column, mask)
+    return array(column.typecode, kept) if isinstance(column, array) else list(kept)
+
+
+def _scalar(value):
+    """Convert NumPy scalars back to plain Python values."""
+    return value.item() if np is not None and isinstance(value, np.generic) else value
+
 # --- Function to stream users in batches (Generator) ---
-def stream_users_in_batches(batch_size):
+def stream_users_in_batches(batch_size, columnar=False):
     """
     Generator function to fetch rows in batches from the 'user_data_table'.
     This simulates fetching data from a database table like 'user_data'
@@ -17,9 +126,11 @@ def stream_users_in_batches(batch_size):
     Args:
         batch_size (int): The number of user records (rows) to include in each batch.
                           Must be a positive integer.
+        columnar (bool): Yield ColumnarBatch objects instead of lists of dicts.
 
     Yields:
-        list: A batch, which is a list of user dictionaries (rows).
+        list: A batch, which is a list of user dictionaries (rows), or a
+              ColumnarBatch when columnar is True.
     """
     if not isinstance(batch_size, int) or batch_size <= 0:
         raise ValueError("batch_size must be a positive integer.")
@@ -31,10 +142,10 @@ def stream_users_in_batches(batch_size):
         # For example, the first batch is like "SELECT * FROM user_data LIMIT batch_size OFFSET 0;"
         # The second is like "SELECT * FROM user_data LIMIT batch_size OFFSET batch_size;" and so on.
         batch = user_data_table[i:i + batch_size]
-        yield batch
+        yield ColumnarBatch.from_rows(batch) if columnar else batch
 
 # --- Function to process batches ---
-def batch_processing(batch_size):
+def batch_processing(batch_size, columnar=False):
     """
     Processes batches of user records obtained from stream_users_in_batches.
     It filters these records to find users who are older than 25.
@@ -42,11 +153,20 @@ def batch_processing(batch_size):
     Args:
         batch_size (int): The size of batches to retrieve from the stream
                           and then process.
+        columnar (bool): Filter ColumnarBatch objects with one vectorized
+                         comparison per batch.
 
     Returns:
         list: A list containing all user dictionaries for users over the age of 25.
               This is the result of processing (filtering) the 'user_data_table'.
+              With columnar=True it is a list of the non-empty filtered
+              ColumnarBatch objects instead.
     """
+    if columnar:
+        filtered = (batch.where('age', '>', 25)
+                    for batch in stream_users_in_batches(batch_size, columnar=True))
+        return [batch for batch in filtered if len(batch)]
+
     users_over_25 = []
 
     # Loop 2: Iterating through the batches provided by the stream_users_in_batches generator.
@@ -59,3 +179,54 @@ def batch_processing(batch_size):
                 users_over_25.append(user_record)
                 
     return users_over_25
+
+# --- Benchmark: dict rows vs. columnar batches ---
+def _synthetic_batches(total_rows, batch_size, columnar):
+    """Generate synthetic user batches without materializing the whole table."""
+    for start in range(1, total_rows + 1, batch_size):
+        ids = range(start, min(start + batch_size, total_rows + 1))
+        if columnar:
+            yield ColumnarBatch.from_columns(
+                id=ids,
+                name=[f'User{i % 1000}' for i in ids],
+                age=[20 + ((i - 1) % 20) for i in ids],
+            )
+        else:
+            yield [{'id': i, 'name': f'User{i % 1000}', 'age': 20 + ((i - 1) % 20)} for i in ids]
+
+
+def benchmark(total_rows=10_000_000, batch_size=100_000):
+    """
+    Compare filter throughput and memory per row of dict batches and
+    columnar batches over total_rows synthetic users.
+
+    Only the filtering step is timed; building the batches is not.
+    Memory per row is measured on a single batch with tracemalloc.
+    """
+    results = {}
+    for label, columnar in (('dict rows', False), ('columnar', True)):
+        tracemalloc.start()
+        sample = next(_synthetic_batches(batch_size, batch_size, columnar))
+        per_row = tracemalloc.get_traced_memory()[0] / batch_size
+        tracemalloc.stop()
+        del sample
+
+        elapsed = 0.0
+        kept = 0
+        for batch in _synthetic_batches(total_rows, batch_size, columnar):
+            start = time.perf_counter()
+            if columnar:
+                kept += len(batch.where('age', '>', 25))
+            else:
+                kept += len([row for row in batch if row['age'] > 25])
+            elapsed += time.perf_counter() - start
+
+        results[label] = {'rows_per_sec': total_rows / elapsed if elapsed else 0.0,
+                          'bytes_per_row': per_row, 'kept': kept}
+        print(f"{label:>10}: {results[label]['rows_per_sec']:,.0f} rows/sec filtered, "
+              f"{per_row:.0f} bytes/row")
+    return results
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
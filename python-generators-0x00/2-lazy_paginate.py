@@ -1,54 +1,340 @@
 #!/usr/bin/python3
+import base64
+import contextlib
+import json
 import mysql.connector
+import mysql.connector.pooling
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def paginate_users(page_size, offset):
+import seed
+
+# Columns a keyset page may be ordered by. Column names cannot be bound as
+# query parameters, so only these are ever interpolated into SQL.
+KEYSET_COLUMNS = ("user_id", "name", "email", "age")
+
+# Seconds to wait for a free pooled connection before raising PoolError
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def connect():
+    """Open a connection to the ALX_prodev database."""
+    return mysql.connector.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASS", ""),
+        database="ALX_prodev"
+    )
+
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use."""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="lazy_paginate",
+                pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+                # Pages only run SELECTs, so there is no session state to
+                # reset; skipping it saves a round trip per checkout
+                pool_reset_session=False,
+                host=os.getenv("DB_HOST", "localhost"),
+                user=os.getenv("DB_USER", "root"),
+                password=os.getenv("DB_PASS", ""),
+                database="ALX_prodev"
+            )
+            _pool_slots = threading.BoundedSemaphore(pool.pool_size)
+            _pool = pool
+    return _pool
+
+
+@contextlib.contextmanager
+def pooled_connection(timeout=None):
+    """
+    Check a connection out of the pool for the duration of a with block.
+
+    MySQLConnectionPool raises PoolError as soon as it is exhausted; this
+    waits up to `timeout` seconds (POOL_TIMEOUT by default) for another
+    caller to return a connection first.
+
+    Raises:
+        mysql.connector.errors.PoolError: No connection freed up in time.
+    """
+    pool = get_pool()
+    timeout = POOL_TIMEOUT if timeout is None else timeout
+    if not _pool_slots.acquire(timeout=timeout):
+        raise mysql.connector.errors.PoolError(
+            f"No connection available in pool {pool.pool_name} after {timeout}s.")
+    try:
+        connection = pool.get_connection()
+    except BaseException:
+        _pool_slots.release()
+        raise
+    try:
+        yield connection
+    finally:
+        connection.close()
+        _pool_slots.release()
+
+
+def _fetch_page(connection, query, params):
+    """Run a page query, opening and closing a connection if none is given."""
+    own_connection = connection is None
+    if own_connection:
+        connection = connect()
+    cursor = seed.dict_cursor(connection)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_connection:
+            connection.close()
+
+
+def paginate_users(page_size, offset, connection=None):
     """
     Fetch a page of users from the database using LIMIT and OFFSET.
 
     Args:
         page_size (int): Number of users to fetch.
         offset (int): Offset to start fetching from.
+        connection: Open connection to reuse. By default a new connection
+                    is opened and closed for the page.
 
     Returns:
         list: List of user dicts.
     """
-    connection = mysql.connector.connect(
-        host=os.getenv("DB_HOST", "localhost"),
-        user=os.getenv("DB_USER", "root"),
-        password=os.getenv("DB_PASS", ""),
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT * FROM user_data LIMIT %s OFFSET %s"
-    cursor.execute(query, (page_size, offset))
-    results = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return results
+    mark = seed.placeholder(connection) if connection else "%s"
+    query = f"SELECT * FROM user_data LIMIT {mark} OFFSET {mark}"
+    return _fetch_page(connection, query, (page_size, offset))
+
+
+def keyset_query(key="user_id", after=False, mark="%s"):
+    """
+    Build the SQL for one keyset page ordered by `key`.
+
+    Pages are ordered by (key, user_id) so a non-unique key still gives a
+    total order; the page after a row is then simply the rows whose
+    (key, user_id) is greater. With an index on the key the database seeks
+    straight to the start of the page instead of skipping OFFSET rows.
+
+    Args:
+        key (str): Column to order by, one of KEYSET_COLUMNS.
+        after (bool): Whether the query resumes after a previous key.
+        mark (str): Parameter marker of the driver ("%s" or "?").
+
+    Returns:
+        str: Query taking the resume values (if any) and the page size.
+    """
+    if key not in KEYSET_COLUMNS:
+        raise ValueError(f"key must be one of {KEYSET_COLUMNS}.")
+    if key == "user_id":
+        where = f"WHERE user_id > {mark} " if after else ""
+        order = "user_id"
+    else:
+        where = f"WHERE ({key}, user_id) > ({mark}, {mark}) " if after else ""
+        order = f"{key}, user_id"
+    return f"SELECT * FROM user_data {where}ORDER BY {order} LIMIT {mark}"
+
+
+def last_key(page, key="user_id"):
+    """Return the resume values for the page after `page`."""
+    row = page[-1]
+    return (row["user_id"],) if key == "user_id" else (row[key], row["user_id"])
+
 
-def lazy_paginate(page_size):
+def encode_cursor(values, key="user_id"):
+    """Encode resume values as an opaque, URL-safe cursor token."""
+    payload = json.dumps({"k": key, "v": list(values)}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token):
+    """
+    Decode a token from encode_cursor.
+
+    Returns:
+        tuple: (key, resume values)
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return payload["k"], tuple(payload["v"])
+    except (ValueError, KeyError, TypeError) as err:
+        raise ValueError("Invalid pagination cursor.") from err
+
+
+def next_cursor(page, key="user_id"):
+    """Return the cursor token that resumes right after `page`."""
+    return encode_cursor(last_key(page, key), key)
+
+
+def paginate_users_after(page_size, after=None, key="user_id", connection=None):
+    """
+    Fetch a page of users ordered by `key`, starting after `after`.
+
+    Args:
+        page_size (int): Number of users to fetch.
+        after (tuple): Resume values from last_key(), or None for page one.
+        key (str): Column to page by.
+        connection: Open connection to reuse, as for paginate_users.
+
+    Returns:
+        list: List of user dicts.
+    """
+    mark = seed.placeholder(connection) if connection else "%s"
+    params = tuple(after or ()) + (page_size,)
+    return _fetch_page(connection, keyset_query(key, after is not None, mark), params)
+
+
+def lazy_paginate(page_size, key=None, cursor=None, prefetch=False, connection=None):
     """
     Generator that lazily fetches pages of users from the database.
 
     Args:
         page_size (int): Number of users per page.
+        key (str): Page by this column using keyset pagination instead of
+                   LIMIT/OFFSET, so every page costs the same no matter how
+                   deep the scan is. Use next_cursor(page, key) to get a
+                   token for resuming after a page.
+        cursor (str): Token from next_cursor() to resume a keyset scan.
+                      Implies keyset pagination on the token's column.
+        prefetch (bool): Fetch the next page on a background thread while
+                         the caller works on the current one.
+        connection: Connection to read every page from. By default each
+                    page checks a connection out of the pool and returns it
+                    straight after, so an open generator holds none while
+                    the caller works on a page. Only DB_POOL_SIZE pages
+                    (5 by default) are fetched at once across all
+                    generators; further fetches wait up to DB_POOL_TIMEOUT
+                    seconds for a free connection, then raise PoolError.
+                    With prefetch the connection is used from a worker
+                    thread, so a sqlite3 connection needs
+                    check_same_thread=False.
 
     Yields:
         list: Next batch of user dicts.
     """
-    offset = 0
+    if cursor is not None:
+        token_key, after = decode_cursor(cursor)
+        if key is not None and key != token_key:
+            raise ValueError("cursor was issued for a different key.")
+        key = token_key
+    else:
+        after = None
+
+    if key is None:
+        position = 0
+
+        def fetch_page(offset, connection):
+            return paginate_users(page_size, offset, connection)
+
+        def advance(offset, page):
+            return offset + page_size
+    else:
+        position = after
+
+        def fetch_page(after, connection):
+            return paginate_users_after(page_size, after, key, connection)
+
+        def advance(after, page):
+            return last_key(page, key)
+
+    if connection is None:
+        # Both kinds of page are self-contained queries, so the connection
+        # can go back to the pool between them
+        def fetch(position):
+            with pooled_connection() as pooled:
+                return fetch_page(position, pooled)
+    else:
+        def fetch(position):
+            return fetch_page(position, connection)
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        pending = executor.submit(fetch, position) if executor else None
+        while True:
+            page = pending.result() if executor else fetch(position)
+            if not page:
+                break
+            position = advance(position, page)
+            # A short page is the last one; don't ask for another
+            last_page = len(page) < page_size
+            if executor and not last_page:
+                pending = executor.submit(fetch, position)
+            yield page
+            if last_page:
+                break
+    finally:
+        if executor:
+            # Let an in-flight fetch finish before the connection goes back
+            executor.shutdown(wait=True)
+
+
+def benchmark(page_size=100, work=0.002, max_pages=200, connect=None):
+    """
+    Compare pages/sec for a per-page connection, a reused connection and a
+    reused connection with prefetch.
+
+    Args:
+        page_size (int): Rows per page.
+        work (float): Seconds of simulated processing per page.
+        max_pages (int): Pages to read per run.
+        connect (callable): Returns the connection used by the reuse runs;
+                            by default one is checked out of the pool.
+
+    Returns:
+        dict: pages/sec keyed by run label.
+    """
+    runs = (
+        ("connection per page", lambda: _per_page_scan(page_size)),
+        ("reused connection", lambda: lazy_paginate(page_size, key="user_id",
+                                                    connection=shared)),
+        ("reused + prefetch", lambda: lazy_paginate(page_size, key="user_id", prefetch=True,
+                                                    connection=shared)),
+    )
+    results = {}
+    with (contextlib.closing(connect()) if connect else pooled_connection()) as shared:
+        for label, scan in runs:
+            start = time.perf_counter()
+            pages = 0
+            for _ in scan():
+                time.sleep(work)
+                pages += 1
+                if pages == max_pages:
+                    break
+            elapsed = time.perf_counter() - start
+            results[label] = pages / elapsed if elapsed else 0.0
+            print(f"{label:>20}: {results[label]:.1f} pages/sec")
+    return results
+
+
+def _per_page_scan(page_size):
+    """The original access pattern: a fresh connection for every page."""
+    after = None
     while True:
-        page = paginate_users(page_size, offset)
+        page = paginate_users_after(page_size, after)
         if not page:
             break
         yield page
-        offset += page_size
+        after = last_key(page)
+
 
 # For manual testing (optional)
 if __name__ == "__main__":
-    for i, page in enumerate(lazy_paginate(5), 1):
+    if sys.argv[1:] == ["benchmark"]:
+        benchmark()
+        sys.exit()
+    for i, page in enumerate(lazy_paginate(5, key="user_id"), 1):
         print(f"Page {i}:")
         for user in page:
             print(user)
+        print(f"Resume token: {next_cursor(page)}")
         print()
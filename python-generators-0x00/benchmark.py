@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+"""
+Benchmark the user_data access patterns against each other.
+
+Seeds a database with synthetic users, runs every access pattern in fresh
+processes and writes rows/sec, time to first row and memory to a JSON
+report. Memory is measured from a baseline taken after imports and setup,
+so it reflects the pattern rather than the interpreter: the growth of
+peak RSS over that baseline, and the tracemalloc peak of a second run
+(kept separate because tracing slows the timed run down several times).
+Passing --compare with an earlier report flags patterns that got slower
+or bigger.
+
+    python3 benchmark.py --rows 200000 --output after.json --compare before.json
+    python3 benchmark.py --backend mysql --output mysql.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from itertools import chain
+
+import seed
+
+stream_users = __import__('0-stream_users').stream_users
+batch_module = __import__('1-batch_processing')
+lazy_paginate_module = __import__('2-lazy_paginate')
+stream_user_ages = __import__('4-stream_ages').stream_user_ages
+
+# Each pattern takes an open connection and returns an iterator of rows
+PATTERNS = {
+    'stream_users': lambda conn: stream_users(connection=conn),
+    'stream_users_prefetch': lambda conn: stream_users(prefetch=1000, connection=conn),
+    'stream_users_in_batches': lambda conn: chain.from_iterable(
+        batch_module.stream_users_in_batches(1000)),
+    'lazy_paginate_offset': lambda conn: chain.from_iterable(
+        lazy_paginate_module.lazy_paginate(1000, connection=conn)),
+    'lazy_paginate_keyset': lambda conn: chain.from_iterable(
+        lazy_paginate_module.lazy_paginate(1000, key='user_id', connection=conn)),
+    'stream_user_ages': lambda conn: stream_user_ages(connection=conn),
+}
+
+
+def synthetic_rows(count, chunk_size=10000):
+    """Yield chunks of deterministic (user_id, name, email, age) tuples."""
+    for start in range(0, count, chunk_size):
+        yield [(str(uuid.uuid5(uuid.NAMESPACE_URL, f'user{i}')), f'User {i}',
+                f'user{i}@example.com', 18 + i % 80)
+               for i in range(start, min(start + chunk_size, count))]
+
+
+def open_connection(target):
+    """Open a connection described by a picklable target dict."""
+    if target['backend'] == 'sqlite':
+        return sqlite3.connect(target['path'])
+    return lazy_paginate_module.connect()
+
+
+def seed_database(target, rows):
+    """Create user_data and fill it with `rows` synthetic users if needed."""
+    connection = open_connection(target)
+    try:
+        seed.create_table(connection)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        existing = cursor.fetchone()[0]
+        cursor.close()
+        if existing < rows:
+            for chunk in synthetic_rows(rows):
+                seed.insert_chunk(connection, chunk)
+    finally:
+        connection.close()
+
+
+def _max_rss_kib():
+    """Peak RSS of this process so far, in KiB."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run_pattern(name, target, rows, results, trace=False):
+    """
+    Child process body: run one pattern and report through `results`.
+    With trace, report only the tracemalloc peak; otherwise the timings
+    and the peak RSS growth over the post-setup baseline.
+    """
+    if name == 'stream_users_in_batches':
+        # The in-memory batch generator reads a module-level table; size it
+        # to match the database so the numbers are comparable.
+        batch_module.user_data_table = [
+            {'id': i, 'name': f'User {i}', 'age': 18 + i % 80} for i in range(rows)]
+    connection = open_connection(target)
+    try:
+        baseline_kib = _max_rss_kib()
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        first_row = None
+        count = 0
+        for _ in PATTERNS[name](connection):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            count += 1
+        elapsed = time.perf_counter() - start
+        if trace:
+            traced_kib = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+    finally:
+        connection.close()
+    if trace:
+        results.put({'peak_traced_kib': traced_kib})
+        return
+    results.put({'rows': count,
+                 'seconds': elapsed,
+                 'rows_per_sec': count / elapsed if elapsed else 0.0,
+                 'time_to_first_row': first_row or 0.0,
+                 'peak_rss_delta_kib': _max_rss_kib() - baseline_kib})
+
+
+def _spawn(context, name, target, rows, trace):
+    """Run _run_pattern in a fresh process; returns its metrics or None."""
+    results = context.Queue()
+    process = context.Process(target=_run_pattern, args=(name, target, rows, results, trace))
+    process.start()
+    process.join()
+    return results.get() if process.exitcode == 0 else None
+
+
+def run(target, rows, patterns=None):
+    """Run each pattern in fresh processes and return {pattern: metrics}."""
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for name in patterns or PATTERNS:
+        timed = _spawn(context, name, target, rows, trace=False)
+        traced = timed and _spawn(context, name, target, rows, trace=True)
+        if not traced:
+            report[name] = {'error': 'pattern process failed'}
+            continue
+        metrics = report[name] = dict(timed, **traced)
+        print(f"{name:>24}: {metrics['rows_per_sec']:>12,.0f} rows/sec  "
+              f"first row {metrics['time_to_first_row'] * 1000:8.2f}ms  "
+              f"peak RSS +{metrics['peak_rss_delta_kib']:>7,} KiB  "
+              f"traced peak {metrics['peak_traced_kib']:>7,} KiB")
+    return report
+
+
+def compare(current, baseline, threshold=0.10):
+    """
+    Print changes against a baseline report.
+
+    Returns:
+        list: Descriptions of metrics that regressed by more than threshold.
+    """
+    regressions = []
+    checks = (('rows_per_sec', -1), ('time_to_first_row', 1),
+              ('peak_rss_delta_kib', 1), ('peak_traced_kib', 1))
+    for name, metrics in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or 'error' in metrics or 'error' in before:
+            continue
+        for metric, worse in checks:
+            # Reports from older versions may lack a metric
+            old, new = before.get(metric), metrics[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            print(f"{name:>24} {metric:>18}: {old:12.4g} -> {new:12.4g} ({change:+.1%})")
+            if change * worse > threshold:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=('sqlite', 'mysql'), default='sqlite')
+    parser.add_argument('--database', help='SQLite file (default: a temporary file)')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--pattern', action='append', choices=sorted(PATTERNS),
+                        help='Run only this pattern (repeatable)')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='Earlier report to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative change that counts as a regression')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        target = {'backend': args.backend,
+                  'path': args.database or os.path.join(workdir, 'users.db')}
+        seed_database(target, args.rows)
+        report = {
+            'meta': {'backend': args.backend, 'rows': args.rows,
+                     'python': platform.python_version(), 'platform': platform.platform(),
+                     'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': run(target, args.rows, args.pattern),
+        }
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
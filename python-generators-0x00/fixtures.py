@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the unit tests in this directory.
+
+The scripts here target MySQL, but every one of them also accepts a
+sqlite3 connection, so the tests run against a small user_data table in
+a temporary sqlite file.
+"""
+
+import io
+import sqlite3
+import uuid
+from contextlib import redirect_stdout
+
+import seed
+
+
+def create_user_data(database: str, rows: int = 10) -> None:
+    """Create a user_data table with `rows` users in database."""
+    conn = sqlite3.connect(database)
+    with redirect_stdout(io.StringIO()):
+        seed.create_table(conn)
+    seed.insert_chunk(conn, user_rows(rows))
+    conn.close()
+
+
+def user_rows(rows: int) -> list:
+    """(user_id, name, email, age) tuples of `rows` users, aged 20 and up."""
+    return [(str(uuid.UUID(int=i + 1)), f"user{i}", f"user{i}@example.com", 20 + i)
+            for i in range(rows)]
+
+
+def import_script(name: str):
+    """Import a numbered script such as '2-lazy_paginate'."""
+    return __import__(name)
@@ -0,0 +1,251 @@
+#!/usr/bin/python3
+"""
+Partitioned, concurrent scans of user_data.
+
+user_id is a UUID string, so its leading hex digits are spread evenly over
+the key space. key_ranges() cuts that space into contiguous ranges and each
+range is read on its own connection:
+
+    for row in partitioned_scan(connect, partitions=8):
+        ...
+
+    stats = partitioned_age_stats(connect, partitions=8)
+    print(stats.average)
+"""
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import seed
+
+RunningStats = __import__('4-stream_ages').RunningStats
+
+# Marks the end of one partition in a queue of chunks
+_END = object()
+
+
+def key_ranges(partitions):
+    """
+    Split the user_id key space into `partitions` contiguous ranges.
+
+    Returns:
+        list: (low, high) pairs of 8-digit hex prefixes; low is inclusive,
+              high exclusive, and None means unbounded.
+    """
+    if not isinstance(partitions, int) or not 1 <= partitions <= 1 << 16:
+        raise ValueError("partitions must be an integer between 1 and 65536.")
+    bounds = [format(i * (1 << 32) // partitions, '08x') for i in range(partitions)]
+    bounds = [None] + bounds[1:] + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _range_clause(connection, low, high):
+    """WHERE clause and parameters selecting one key range."""
+    mark = seed.placeholder(connection)
+    clauses, params = [], ()
+    if low is not None:
+        clauses.append(f"user_id >= {mark}")
+        params += (low,)
+    if high is not None:
+        clauses.append(f"user_id < {mark}")
+        params += (high,)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def scan_partition(connect, low, high, ordered=False, chunk_size=1000):
+    """Generator yielding lists of row dicts for one key range."""
+    connection = connect()
+    cursor = seed.dict_cursor(connection, buffered=False)
+    try:
+        where, params = _range_clause(connection, low, high)
+        order = " ORDER BY user_id" if ordered else ""
+        cursor.execute(f"SELECT * FROM user_data{where}{order}", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # Abandoned mid-partition when the consumer stops early
+        try:
+            seed.close_cursor(cursor)
+        finally:
+            connection.close()
+
+
+def _put(out, item, stop):
+    """Put item in `out` unless stop is set first. Returns whether it did."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(out, errors):
+    """Next item from `out`, raising as soon as any partition has failed."""
+    while True:
+        if errors:
+            raise errors[0]
+        try:
+            return out.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+def _produce(connect, low, high, ordered, chunk_size, out, stop, errors):
+    """Thread body: push a partition's chunks into `out`, then _END."""
+    try:
+        for rows in scan_partition(connect, low, high, ordered, chunk_size):
+            if not _put(out, rows, stop):
+                return
+    except Exception as err:
+        errors.append(err)
+    _put(out, _END, stop)
+
+
+def partitioned_scan(connect, partitions=4, ordered=False, chunk_size=1000, buffer=4):
+    """
+    Generator that streams all of user_data with one thread per partition.
+
+    Args:
+        connect (callable): Returns a new connection; called once per partition.
+        partitions (int): Number of key ranges read concurrently.
+        ordered (bool): Yield rows in user_id order. Partitions are still
+                        read concurrently, but each one buffers at most
+                        `buffer` chunks until it is its turn to be yielded.
+                        Unordered yields chunks as soon as any partition
+                        produces them.
+        chunk_size (int): Rows per fetchmany() call.
+        buffer (int): Chunks buffered per partition.
+
+    Yields:
+        dict: One user row at a time.
+
+    Raises:
+        The first error from any partition, as soon as it happens; the
+        other partitions are then stopped rather than read to the end.
+    """
+    ranges = key_ranges(partitions)
+    stop = threading.Event()
+    errors = []
+    if ordered:
+        queues = [queue.Queue(maxsize=buffer) for _ in ranges]
+    else:
+        shared = queue.Queue(maxsize=buffer * partitions)
+        queues = [shared] * len(ranges)
+    threads = [threading.Thread(target=_produce,
+                                args=(connect, low, high, ordered, chunk_size, out, stop, errors),
+                                daemon=True)
+               for (low, high), out in zip(ranges, queues)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        if ordered:
+            for out in queues:
+                for rows in iter(partial(_get, out, errors), _END):
+                    yield from rows
+        else:
+            remaining = len(threads)
+            while remaining:
+                rows = _get(shared, errors)
+                if rows is _END:
+                    remaining -= 1
+                    continue
+                yield from rows
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        for out in {id(out): out for out in queues}.values():
+            # Unblock producers waiting on a full queue
+            while not out.empty():
+                out.get_nowait()
+        for thread in threads:
+            thread.join()
+
+
+def _partition_stats(connect, low, high, pushdown, chunk_size):
+    """
+    Age statistics for one key range as a plain tuple, so it can cross a
+    process boundary.
+    """
+    connection = connect()
+    cursor = connection.cursor() if seed.is_sqlite(connection) else connection.cursor(buffered=False)
+    stats = RunningStats()
+    try:
+        where, params = _range_clause(connection, low, high)
+        if pushdown:
+            cursor.execute("SELECT COUNT(age), SUM(age), MIN(age), MAX(age), SUM(age * age) "
+                           f"FROM user_data{where}", params)
+            count, total, low_age, high_age, squares = cursor.fetchone()
+            if count:
+                stats.count, stats.total = count, total
+                stats.min, stats.max = low_age, high_age
+                stats.mean = float(total) / count
+                # Sum-of-squares is less stable than Welford, but lets the
+                # database do all the work for the partition
+                stats.m2 = max(float(squares) - float(total) * stats.mean, 0.0)
+        else:
+            cursor.execute(f"SELECT age FROM user_data{where}", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                stats.update(age for (age,) in rows)
+    finally:
+        try:
+            seed.close_cursor(cursor)
+        finally:
+            connection.close()
+    return tuple(getattr(stats, name) for name in RunningStats.__slots__)
+
+
+def partitioned_age_stats(connect, partitions=4, pushdown=True, processes=False,
+                          chunk_size=1000):
+    """
+    Compute age statistics over user_data, one key range per worker.
+
+    Each partition is aggregated independently (in the database when
+    pushdown is on, otherwise by streaming its ages) and the partial results
+    are combined with RunningStats.merge.
+
+    Args:
+        connect (callable): Returns a new connection. With processes=True it
+                            must be picklable, i.e. a module-level function.
+        partitions (int): Number of key ranges.
+        pushdown (bool): Aggregate each range in SQL.
+        processes (bool): Use a process pool instead of threads, for when
+                          streamed aggregation is CPU bound.
+        chunk_size (int): Ages per fetch when streaming.
+
+    Returns:
+        RunningStats: Combined statistics; .average is the mean age.
+    """
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    total = RunningStats()
+    with pool_class(max_workers=partitions) as pool:
+        futures = [pool.submit(_partition_stats, connect, low, high, pushdown, chunk_size)
+                   for low, high in key_ranges(partitions)]
+        for future in futures:
+            part = RunningStats()
+            for name, value in zip(RunningStats.__slots__, future.result()):
+                setattr(part, name, value)
+            total.merge(part)
+    return total
+
+
+if __name__ == "__main__":
+    connect = __import__('4-stream_ages').connect
+    for count in (1, 2, 4, 8):
+        start = time.perf_counter()
+        stats = partitioned_age_stats(connect, partitions=count,
+                                      pushdown="--stream" not in sys.argv[1:])
+        elapsed = time.perf_counter() - start
+        print(f"{count} partitions: average age {stats.average:.2f} in {elapsed:.3f}s")
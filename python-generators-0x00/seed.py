@@ -2,8 +2,15 @@
 
 import mysql.connector
 import csv
+import os
+import sqlite3
+import sys
+import tempfile
+import time
 import uuid
 
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
 # Connect to MySQL server (without database)
 def connect_db():
     try:
@@ -37,42 +44,219 @@ def connect_to_prodev():
         print(f"Error: {err}")
         return None
 
+# True when the connection is a sqlite3 stand-in rather than MySQL
+def is_sqlite(connection):
+    return isinstance(connection, sqlite3.Connection)
+
+# Parameter marker for the connection's driver (%s for MySQL, ? for sqlite3)
+def placeholder(connection):
+    return '?' if is_sqlite(connection) else '%s'
+
+# Cursor that returns rows as dictionaries on either driver.
+# buffered=False asks mysql-connector to stream rows from the server instead
+# of reading the whole result set first; sqlite3 cursors always step lazily.
+def dict_cursor(connection, buffered=None):
+    if is_sqlite(connection):
+        cursor = connection.cursor()
+        cursor.row_factory = lambda cur, row: dict(zip([col[0] for col in cur.description], row))
+        return cursor
+    if buffered is None:
+        return connection.cursor(dictionary=True)
+    return connection.cursor(dictionary=True, buffered=buffered)
+
+# Close a cursor that may have been abandoned mid-stream. mysql-connector
+# refuses to close an unbuffered cursor with unread rows ("Unread result
+# found"). Closing the connection discards them, so that error is ignored;
+# pass `connection` when the caller keeps using it, and the rest of the
+# result is read and dropped so the connection stays usable.
+def close_cursor(cursor, connection=None):
+    try:
+        cursor.close()
+    except mysql.connector.Error:
+        if connection is None:
+            return
+        try:
+            connection.consume_results()
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
 # Create user_data table
 def create_table(connection):
     cursor = connection.cursor()
-    query = """
-    CREATE TABLE IF NOT EXISTS user_data (
-        user_id VARCHAR(36) PRIMARY KEY,
-        name VARCHAR(255) NOT NULL,
-        email VARCHAR(255) NOT NULL,
-        age DECIMAL NOT NULL,
-        INDEX(user_id)
-    )
-    """
+    if is_sqlite(connection):
+        query = """
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id VARCHAR(36) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            age DECIMAL NOT NULL
+        )
+        """
+    else:
+        query = """
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id VARCHAR(36) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            age DECIMAL NOT NULL,
+            INDEX(user_id)
+        )
+        """
     cursor.execute(query)
     connection.commit()
     cursor.close()
     print("Table user_data created successfully")
 
-# Insert data from CSV file
+# Build the (user_id, name, email, age) tuple for a CSV row.
+# The shipped CSV has no user_id column, so one is derived from the email;
+# a UUID5 is stable, which keeps re-seeding idempotent.
+def row_values(row):
+    user_id = row.get('user_id') or str(uuid.uuid5(uuid.NAMESPACE_URL, row['email']))
+    return (user_id, row['name'], row['email'], row['age'])
+
+# Insert data from CSV file (row by row, with an existence check per row)
 def insert_data(connection, filename):
     cursor = connection.cursor()
+    mark = placeholder(connection)
     with open(filename, mode='r', encoding='utf-8') as file:
         reader = csv.DictReader(file)
         for row in reader:
+            values = row_values(row)
             # Check if user already exists
-            cursor.execute("SELECT user_id FROM user_data WHERE user_id = %s", (row['user_id'],))
+            cursor.execute(f"SELECT user_id FROM user_data WHERE user_id = {mark}", (values[0],))
             if cursor.fetchone():
                 continue
-            query = """
+            query = f"""
             INSERT INTO user_data (user_id, name, email, age)
-            VALUES (%s, %s, %s, %s)
+            VALUES ({mark}, {mark}, {mark}, {mark})
             """
-            cursor.execute(query, (
-                row['user_id'],
-                row['name'],
-                row['email'],
-                row['age']
-            ))
+            cursor.execute(query, values)
     connection.commit()
     cursor.close()
+
+# Stream the CSV as lists of value tuples, chunk_size rows at a time
+def read_chunks(filename, chunk_size=1000):
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    with open(filename, mode='r', encoding='utf-8', newline='') as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            chunk.append(row_values(row))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+# Multi-row INSERT statement for one chunk.
+# on_duplicate is 'ignore' (keep existing rows) or 'update' (overwrite them).
+def insert_statement(connection, on_duplicate='ignore'):
+    mark = placeholder(connection)
+    values = f"({mark}, {mark}, {mark}, {mark})"
+    columns = ', '.join(USER_COLUMNS)
+    if on_duplicate == 'ignore':
+        verb = 'INSERT OR IGNORE' if is_sqlite(connection) else 'INSERT IGNORE'
+        return f"{verb} INTO user_data ({columns}) VALUES {values}"
+    if on_duplicate == 'update':
+        if is_sqlite(connection):
+            return (f"INSERT INTO user_data ({columns}) VALUES {values} "
+                    "ON CONFLICT(user_id) DO UPDATE SET name = excluded.name, "
+                    "email = excluded.email, age = excluded.age")
+        return (f"INSERT INTO user_data ({columns}) VALUES {values} "
+                "ON DUPLICATE KEY UPDATE name = VALUES(name), "
+                "email = VALUES(email), age = VALUES(age)")
+    raise ValueError("on_duplicate must be 'ignore' or 'update'.")
+
+# Insert one chunk of value tuples and commit it.
+# mysql-connector rewrites executemany() on an INSERT ... VALUES statement
+# into a single multi-row INSERT; sqlite3 reuses one prepared statement.
+def insert_chunk(connection, rows, on_duplicate='ignore'):
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(insert_statement(connection, on_duplicate), rows)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(rows)
+
+# Load one chunk through LOAD DATA LOCAL INFILE (MySQL only).
+# The connection must be opened with allow_local_infile=True.
+def load_chunk(connection, rows, on_duplicate='ignore'):
+    if is_sqlite(connection):
+        raise ValueError("LOAD DATA is only available on MySQL connections.")
+    modifier = {'ignore': 'IGNORE', 'update': 'REPLACE'}.get(on_duplicate)
+    if modifier is None:
+        raise ValueError("on_duplicate must be 'ignore' or 'update'.")
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, mode='w', encoding='utf-8', newline='') as file:
+            csv.writer(file, lineterminator='\n').writerows(rows)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s {modifier} INTO TABLE user_data "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(USER_COLUMNS)})",
+                (path,)
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+    finally:
+        os.remove(path)
+    return len(rows)
+
+# Bulk insert data from CSV file.
+# Streams the file in chunks, inserts each chunk with one multi-row statement
+# (or LOAD DATA when use_load_data is set), commits per chunk and reports rows/sec.
+def bulk_insert_data(connection, filename, chunk_size=1000, on_duplicate='ignore',
+                     use_load_data=False):
+    insert = load_chunk if use_load_data else insert_chunk
+    total = 0
+    start = time.perf_counter()
+    for rows in read_chunks(filename, chunk_size):
+        total += insert(connection, rows, on_duplicate)
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else float('inf')
+    print(f"Inserted {total} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+    return total
+
+# Compare the row-by-row insert_data path with bulk_insert_data on a
+# throwaway sqlite3 database. repeat multiplies the CSV to get a bigger load.
+def benchmark(filename='user_data.csv', chunk_size=1000, repeat=10):
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'users.csv')
+        with open(filename, mode='r', encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        with open(source, mode='w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['name', 'email', 'age'])
+            writer.writeheader()
+            for n in range(repeat):
+                for row in rows:
+                    writer.writerow({'name': row['name'], 'email': f"{n}.{row['email']}",
+                                     'age': row['age']})
+        total = len(rows) * repeat
+
+        results = {}
+        for label, load in (('row-by-row', insert_data),
+                            ('bulk', lambda conn, path: bulk_insert_data(conn, path, chunk_size))):
+            connection = sqlite3.connect(os.path.join(workdir, f'{label}.db'))
+            create_table(connection)
+            start = time.perf_counter()
+            load(connection, source)
+            results[label] = time.perf_counter() - start
+            connection.close()
+
+    for label, elapsed in results.items():
+        print(f"{label:>10}: {total} rows in {elapsed:.2f}s ({total / elapsed:.0f} rows/sec)")
+    return results
+
+if __name__ == '__main__':
+    benchmark(*sys.argv[1:2])
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import seed
+
+# Sentinel telling a writer thread there is nothing left to insert
+_DONE = object()
+
+
+# Split the data part of a CSV file into byte ranges of roughly chunk_bytes.
+# Returns the header fields and a list of (start, end) offsets. A line belongs
+# to the range its first byte falls in, so ranges never need to line up with
+# line boundaries. Quoted fields spanning several lines are not supported.
+def split_ranges(filename, chunk_bytes=1 << 20):
+    if not isinstance(chunk_bytes, int) or chunk_bytes <= 0:
+        raise ValueError("chunk_bytes must be a positive integer.")
+    with open(filename, mode='rb') as file:
+        header = file.readline()
+        data_start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+    fields = next(csv.reader([header.decode('utf-8')]))
+    ranges = [(start, min(start + chunk_bytes, size))
+              for start in range(data_start, size, chunk_bytes)]
+    return fields, ranges
+
+
+# Parse the lines starting inside [start, end) into seed value tuples.
+# Runs in a worker process and returns (rows, seconds spent parsing).
+def parse_range(filename, fields, start, end):
+    began = time.perf_counter()
+    lines = []
+    with open(filename, mode='rb') as file:
+        file.seek(start - 1)
+        # Skip the tail of a line that started in the previous range
+        if file.read(1) != b'\n':
+            file.readline()
+        while file.tell() < end:
+            line = file.readline()
+            if not line:
+                break
+            lines.append(line.decode('utf-8'))
+    rows = [seed.row_values(dict(zip(fields, values)))
+            for values in csv.reader(lines) if values]
+    return rows, time.perf_counter() - began
+
+
+# Set of committed chunk indexes, persisted to a JSON file after every commit.
+# The file also records the input and chunk size so a stale checkpoint is
+# never applied to a different split.
+class Checkpoint:
+    def __init__(self, path, filename, chunk_bytes):
+        self.path = path
+        self.key = {'file': os.path.abspath(filename), 'chunk_bytes': chunk_bytes,
+                    'size': os.path.getsize(filename)}
+        self.done = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('key') == self.key:
+                self.done = set(state['done'])
+
+    def mark(self, index):
+        with self._lock:
+            self.done.add(index)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, mode='w', encoding='utf-8') as file:
+                json.dump({'key': self.key, 'done': sorted(self.done)}, file)
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Writer thread: pull (index, rows) batches, insert and commit each one on
+# its own connection, then record the chunk in the checkpoint.
+def _writer(connect, batches, checkpoint, on_duplicate, stats, errors):
+    connection = None
+    try:
+        connection = connect()
+        if connection is None:
+            # connect_to_prodev() reports its error and returns None
+            raise ConnectionError("Could not connect to the database.")
+        while True:
+            item = batches.get()
+            if item is _DONE:
+                break
+            index, rows = item
+            began = time.perf_counter()
+            seed.insert_chunk(connection, rows, on_duplicate)
+            elapsed = time.perf_counter() - began
+            checkpoint.mark(index)
+            with stats['lock']:
+                stats['insert'] += elapsed
+                stats['rows'] += len(rows)
+    except Exception as err:
+        errors.append(err)
+        # Keep draining so the producer never blocks on a full queue
+        while batches.get() is not _DONE:
+            pass
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+# Seed user_data from a CSV file with parse workers and writer connections.
+#
+# The file is split into byte ranges that are parsed in a process pool.
+# Parsed batches go through a bounded queue to `writers` threads, each with
+# its own connection from `connect`. Every committed chunk is recorded in
+# `checkpoint_path`, so re-running after an interruption skips the chunks
+# that already made it to the database. Prints per-stage timing and returns
+# the number of rows inserted by this run.
+def parallel_seed(connect, filename, workers=None, writers=2, chunk_bytes=1 << 20,
+                  queue_size=None, on_duplicate='ignore', checkpoint_path=None):
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or 2 * writers
+    started = time.perf_counter()
+
+    fields, ranges = split_ranges(filename, chunk_bytes)
+    checkpoint = Checkpoint(checkpoint_path, filename, chunk_bytes)
+    pending = [index for index in range(len(ranges)) if index not in checkpoint.done]
+    split_time = time.perf_counter() - started
+
+    batches = queue.Queue(maxsize=queue_size)
+    stats = {'lock': threading.Lock(), 'insert': 0.0, 'rows': 0}
+    errors = []
+    threads = [threading.Thread(target=_writer,
+                                args=(connect, batches, checkpoint, on_duplicate, stats, errors),
+                                daemon=True)
+               for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+
+    parse_time = 0.0
+    queue_wait = 0.0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of parse jobs in flight so a huge file is
+            # never parsed far ahead of what the writers can absorb.
+            window = []
+            position = 0
+            while (position < len(pending) or window) and not errors:
+                while position < len(pending) and len(window) < workers + queue_size:
+                    index = pending[position]
+                    window.append((index, pool.submit(parse_range, filename, fields,
+                                                      *ranges[index])))
+                    position += 1
+                index, future = window.pop(0)
+                rows, seconds = future.result()
+                parse_time += seconds
+                began = time.perf_counter()
+                batches.put((index, rows))
+                queue_wait += time.perf_counter() - began
+            for future in window:
+                future[1].cancel()
+    finally:
+        for _ in threads:
+            batches.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    if len(checkpoint.done) == len(ranges):
+        checkpoint.clear()
+
+    total = time.perf_counter() - started
+    rows = stats['rows']
+    print(f"chunks: {len(pending)} of {len(ranges)} "
+          f"({len(ranges) - len(pending)} resumed from checkpoint)")
+    print(f"split:  {split_time:.2f}s")
+    print(f"parse:  {parse_time:.2f}s across {workers} workers")
+    print(f"queue:  {queue_wait:.2f}s producer blocked on full queue")
+    print(f"insert: {stats['insert']:.2f}s across {writers} writers")
+    print(f"total:  {total:.2f}s, {rows} rows ({rows / total if total else 0:.0f} rows/sec)")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed user_data in parallel from a CSV file.")
+    parser.add_argument('filename', nargs='?', default='user_data.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--chunk-bytes', type=int, default=1 << 20)
+    parser.add_argument('--checkpoint', default='seed.checkpoint.json')
+    args = parser.parse_args()
+
+    parallel_seed(seed.connect_to_prodev, args.filename, workers=args.workers,
+                  writers=args.writers, chunk_bytes=args.chunk_bytes,
+                  checkpoint_path=args.checkpoint)
@@ -0,0 +1,293 @@
+#!/usr/bin/python3
+"""
+Lazy, composable operators over the user_data generators.
+
+A Stream wraps any row source (stream_users(), the batches from
+stream_users_in_batches(), or a database table) and chains filter, map,
+project and take without building intermediate lists. When the source is a
+table, `where()` predicates, projections and take() that come before any
+Python-only step are pushed into the SQL query, so the database does the
+filtering and only matching rows travel over the wire. A filter on a
+column an earlier project() dropped is not pushed down, so it fails the
+same way (KeyError) whether or not the source is a table.
+
+    adults = (Stream.from_table(connection)
+              .filter(where('age', '>=', 18))
+              .project('name', 'age')
+              .take(100))
+    for row in adults:
+        ...
+
+    Stream.from_batches(stream_users_in_batches(50)).aggregate(n=Count(), avg=Avg('age'))
+"""
+import operator
+import re
+from abc import ABC, abstractmethod
+from itertools import chain, islice
+
+import seed
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+    '<=': operator.le, '=': operator.eq, '==': operator.eq, '!=': operator.ne,
+}
+
+
+def _check_identifier(name):
+    """Reject anything that is not a plain column or table name."""
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return name
+
+
+class Predicate:
+    """
+    A `column op value` condition usable both in Python and in SQL.
+
+    NULLs follow SQL: comparing with None means IS NULL (or IS NOT NULL
+    for !=), and a NULL column never matches a comparison with a value.
+    """
+
+    __slots__ = ('column', 'op', 'value')
+
+    def __init__(self, column, op, value):
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator: {op!r}")
+        if value is None and op not in ('=', '==', '!='):
+            raise ValueError(f"None can only be compared with =, == or !=, not {op!r}")
+        self.column = _check_identifier(column)
+        self.op = op
+        self.value = value
+
+    def __call__(self, row):
+        value = row[self.column]
+        if self.value is None:
+            return (value is None) != (self.op == '!=')
+        if value is None:
+            return False
+        return _OPERATORS[self.op](value, self.value)
+
+    def sql(self, mark):
+        if self.value is None:
+            return f"{self.column} IS {'NOT ' if self.op == '!=' else ''}NULL", ()
+        op = '=' if self.op == '==' else self.op
+        return f"{self.column} {op} {mark}", (self.value,)
+
+
+def where(column, op, value):
+    """Build a Predicate that Stream.filter can push down to SQL."""
+    return Predicate(column, op, value)
+
+
+# --- Aggregates ---
+class Aggregate(ABC):
+    """Base class: an aggregate folds rows into a state and reports a result."""
+
+    def __init__(self, column=None):
+        self.column = column
+
+    def start(self):
+        return None
+
+    @abstractmethod
+    def add(self, state, row):
+        """Return the state after folding in row."""
+
+    def result(self, state):
+        return state
+
+
+class Count(Aggregate):
+    def start(self):
+        return 0
+
+    def add(self, state, row):
+        return state + 1
+
+
+class Sum(Aggregate):
+    def start(self):
+        return 0
+
+    def add(self, state, row):
+        return state + row[self.column]
+
+
+class Avg(Aggregate):
+    def start(self):
+        return (0, 0)
+
+    def add(self, state, row):
+        return state[0] + row[self.column], state[1] + 1
+
+    def result(self, state):
+        return state[0] / state[1] if state[1] else None
+
+
+class Min(Aggregate):
+    def add(self, state, row):
+        value = row[self.column]
+        return value if state is None or value < state else state
+
+
+class Max(Aggregate):
+    def add(self, state, row):
+        value = row[self.column]
+        return value if state is None or value > state else state
+
+
+class _TableQuery:
+    """The parts of a table scan that can still be expressed in SQL."""
+
+    __slots__ = ('connection', 'table', 'columns', 'predicates', 'limit', 'batch_size')
+
+    def __init__(self, connection, table, columns, predicates, limit, batch_size):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.predicates = predicates
+        self.limit = limit
+        self.batch_size = batch_size
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return _TableQuery(**values)
+
+    def sql(self):
+        mark = seed.placeholder(self.connection)
+        columns = ', '.join(self.columns) if self.columns else '*'
+        query = f"SELECT {columns} FROM {self.table}"
+        params = ()
+        if self.predicates:
+            clauses = []
+            for predicate in self.predicates:
+                clause, values = predicate.sql(mark)
+                clauses.append(clause)
+                params += values
+            query += " WHERE " + " AND ".join(clauses)
+        if self.limit is not None:
+            query += f" LIMIT {mark}"
+            params += (self.limit,)
+        return query, params
+
+    def rows(self):
+        query, params = self.sql()
+        cursor = seed.dict_cursor(self.connection, buffered=False)
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            # The caller's connection stays open, so drain what is unread
+            seed.close_cursor(cursor, self.connection)
+
+
+class Stream:
+    """
+    A lazy sequence of row dictionaries.
+
+    Every operator returns a new Stream; nothing is read until the stream is
+    iterated or aggregated, and rows flow through the chain one at a time.
+    """
+
+    def __init__(self, source, steps=(), query=None):
+        self._source = source
+        self._steps = steps
+        self._query = query
+
+    # --- Sources ---
+    @classmethod
+    def from_rows(cls, rows):
+        """Wrap an iterable of rows, e.g. stream_users()."""
+        return cls(lambda: iter(rows))
+
+    @classmethod
+    def from_batches(cls, batches):
+        """Wrap an iterable of row lists, e.g. stream_users_in_batches(n)."""
+        return cls(lambda: chain.from_iterable(batches))
+
+    @classmethod
+    def from_table(cls, connection, table='user_data', batch_size=1000):
+        """Scan a table, pushing predicates, projections and limits into SQL."""
+        query = _TableQuery(connection, _check_identifier(table), None, (), None, batch_size)
+        return cls(None, query=query)
+
+    # --- Operators ---
+    def _then(self, step):
+        return Stream(self._source, self._steps + (step,), self._query)
+
+    @property
+    def _pushable(self):
+        return self._query is not None and not self._steps
+
+    def filter(self, predicate):
+        """Keep rows for which predicate(row) is true."""
+        if (isinstance(predicate, Predicate) and self._pushable and self._query.limit is None
+                and (self._query.columns is None or predicate.column in self._query.columns)):
+            query = self._query.replace(predicates=self._query.predicates + (predicate,))
+            return Stream(self._source, self._steps, query)
+        return self._then(lambda rows: filter(predicate, rows))
+
+    def map(self, func):
+        """Transform every row with func."""
+        return self._then(lambda rows: map(func, rows))
+
+    def project(self, *columns):
+        """Keep only the given columns of every row."""
+        for column in columns:
+            _check_identifier(column)
+        if self._pushable and self._query.columns is None:
+            return Stream(self._source, self._steps, self._query.replace(columns=columns))
+        return self._then(lambda rows: ({c: row[c] for c in columns} for row in rows))
+
+    def take(self, n):
+        """Stop after the first n rows."""
+        if not isinstance(n, int) or n < 0:
+            raise ValueError("n must be a non-negative integer.")
+        if self._pushable:
+            limit = n if self._query.limit is None else min(n, self._query.limit)
+            return Stream(self._source, self._steps, self._query.replace(limit=limit))
+        return self._then(lambda rows: islice(rows, n))
+
+    def __iter__(self):
+        rows = self._query.rows() if self._query is not None else self._source()
+        for step in self._steps:
+            rows = step(rows)
+        return iter(rows)
+
+    # --- Sinks ---
+    def aggregate(self, **aggregates):
+        """Fold the whole stream into {name: result} in constant memory."""
+        states = {name: agg.start() for name, agg in aggregates.items()}
+        for row in self:
+            for name, agg in aggregates.items():
+                states[name] = agg.add(states[name], row)
+        return {name: agg.result(states[name]) for name, agg in aggregates.items()}
+
+    def group_by(self, key, **aggregates):
+        """
+        Aggregate per group and yield one dict per group.
+
+        key is a column name or a function of the row. Memory grows with the
+        number of groups, not the number of rows.
+        """
+        key_of = (lambda row: row[key]) if isinstance(key, str) else key
+        label = key if isinstance(key, str) else 'key'
+        groups = {}
+        for row in self:
+            group = key_of(row)
+            states = groups.get(group)
+            if states is None:
+                states = groups[group] = {name: agg.start() for name, agg in aggregates.items()}
+            for name, agg in aggregates.items():
+                states[name] = agg.add(states[name], row)
+        for group, states in groups.items():
+            result = {label: group}
+            result.update({name: agg.result(states[name]) for name, agg in aggregates.items()})
+            yield result
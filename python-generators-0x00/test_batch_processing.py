@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for the columnar batches in
+1-batch_processing.
+"""
+
+import unittest
+from array import array
+from unittest.mock import patch
+
+from fixtures import import_script
+
+batch_processing = import_script('1-batch_processing')
+ColumnarBatch = batch_processing.ColumnarBatch
+
+
+class TestColumnarBatch(unittest.TestCase):
+    """
+    Test class for 1-batch_processing.ColumnarBatch and the columnar mode
+    of batch_processing.
+    """
+
+    rows = [{'id': 1, 'name': 'a', 'age': 30}, {'id': 2, 'name': 'b', 'age': 20},
+            {'id': 3, 'name': 'a', 'age': 26.5}]
+
+    def test_round_trip(self) -> None:
+        """Test rows come back as plain Python values after a filter."""
+        batch = ColumnarBatch.from_rows(self.rows)
+        kept = list(batch.where('age', '>', 25).rows())
+        self.assertEqual(kept, [self.rows[0], self.rows[2]])
+        self.assertEqual([type(row['id']) for row in kept], [int, int])
+
+    def test_without_numpy(self) -> None:
+        """Test the array.array fallback filters the same way."""
+        with patch.object(batch_processing, 'np', None):
+            batch = ColumnarBatch.from_rows(self.rows)
+            self.assertIsInstance(batch.columns['id'], array)
+            self.assertEqual(batch.columns['age'].typecode, 'd')
+            self.assertEqual(list(batch.where('age', '<=', 26.5).rows()), self.rows[1:])
+
+    def test_mismatched_columns(self) -> None:
+        """Test columns of different lengths are rejected."""
+        with self.assertRaises(ValueError):
+            ColumnarBatch.from_columns(id=[1, 2], age=[3])
+
+    def test_columnar_matches_dict_rows(self) -> None:
+        """Test both batch_processing modes keep the same users."""
+        columnar = [row for batch in batch_processing.batch_processing(7, columnar=True)
+                    for row in batch.rows()]
+        self.assertEqual(columnar, batch_processing.batch_processing(7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for benchmark.
+"""
+
+import io
+import os
+import queue
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Test class for the benchmark measurements and report comparison.
+    """
+
+    def setUp(self) -> None:
+        """Seed a small sqlite database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.target = {'backend': 'sqlite', 'path': os.path.join(self.tmp.name, 'users.db')}
+        with redirect_stdout(io.StringIO()):
+            benchmark.seed_database(self.target, 2500)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def run_pattern(self, name: str, trace: bool) -> dict:
+        """Run one pattern in this process and return its metrics."""
+        results = queue.Queue()
+        benchmark._run_pattern(name, self.target, 2500, results, trace)
+        return results.get_nowait()
+
+    def test_timed_run(self) -> None:
+        """Test a timed run reports rows and growth over the post-setup baseline."""
+        metrics = self.run_pattern('lazy_paginate_keyset', trace=False)
+        self.assertEqual(metrics['rows'], 2500)
+        self.assertGreater(metrics['rows_per_sec'], 0)
+        self.assertGreaterEqual(metrics['peak_rss_delta_kib'], 0)
+        self.assertNotIn('peak_traced_kib', metrics)
+
+    def test_traced_peak_reflects_page_size(self) -> None:
+        """Test the traced peak grows with what a pattern holds at once."""
+        paged = self.run_pattern('lazy_paginate_keyset', trace=True)['peak_traced_kib']
+        streamed = self.run_pattern('stream_users', trace=True)['peak_traced_kib']
+        self.assertGreater(paged, streamed)
+
+    def test_compare_flags_regressions(self) -> None:
+        """Test compare() flags slower or bigger patterns past the threshold."""
+        before = {'results': {'p': {'rows_per_sec': 1000, 'time_to_first_row': 0.01,
+                                    'peak_rss_kib': 40000, 'peak_traced_kib': 100}}}
+        after = {'results': {'p': {'rows_per_sec': 800, 'time_to_first_row': 0.01,
+                                   'peak_rss_delta_kib': 50, 'peak_traced_kib': 105}}}
+        with redirect_stdout(io.StringIO()):
+            regressions = benchmark.compare(after, before)
+        self.assertEqual(regressions, ['p rows_per_sec -20.0%'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for the keyset pagination in
+2-lazy_paginate.
+"""
+
+import sqlite3
+import unittest
+
+from fixtures import import_script, user_rows
+
+lazy_paginate = import_script('2-lazy_paginate')
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """
+    Test class for keyset_query, the cursor tokens and keyset lazy_paginate.
+    """
+
+    def setUp(self) -> None:
+        """
+        Ten users whose ages repeat, so age alone is not a unique key. The
+        connection may be used from the prefetch thread.
+        """
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute("CREATE TABLE user_data (user_id TEXT PRIMARY KEY, name TEXT, "
+                          "email TEXT, age INTEGER)")
+        self.conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)",
+                              [row[:3] + (20 + i % 3,) for i, row in enumerate(user_rows(10))])
+
+    def tearDown(self) -> None:
+        """Close the connection."""
+        self.conn.close()
+
+    def pages(self, size: int, **options) -> list:
+        """Every page of a keyset scan over the test connection."""
+        return list(lazy_paginate.lazy_paginate(size, connection=self.conn, **options))
+
+    def test_keyset_query(self) -> None:
+        """Test a non-unique key is paired with user_id and columns are checked."""
+        self.assertEqual(lazy_paginate.keyset_query('user_id', after=True),
+                         "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s")
+        self.assertEqual(lazy_paginate.keyset_query('age', after=True, mark='?'),
+                         "SELECT * FROM user_data WHERE (age, user_id) > (?, ?) "
+                         "ORDER BY age, user_id LIMIT ?")
+        with self.assertRaises(ValueError):
+            lazy_paginate.keyset_query('age; DROP TABLE user_data')
+
+    def test_non_unique_key_reads_every_row_once(self) -> None:
+        """Test paging by age neither skips nor repeats rows sharing an age."""
+        rows = [row for page in self.pages(3, key='age') for row in page]
+        expected = sorted(self.conn.execute("SELECT age, user_id FROM user_data"))
+        self.assertEqual([(row['age'], row['user_id']) for row in rows], expected)
+
+    def test_resume_from_cursor(self) -> None:
+        """Test a token from one page resumes the scan right after it."""
+        first, second, *rest = self.pages(4, key='age')
+        token = lazy_paginate.next_cursor(first, 'age')
+        resumed = self.pages(4, cursor=token)
+        self.assertEqual(resumed, [second] + rest)
+        with self.assertRaises(ValueError):
+            self.pages(4, key='user_id', cursor=token)
+
+    def test_invalid_cursor(self) -> None:
+        """Test a malformed token raises ValueError."""
+        for token in ('not base64!', lazy_paginate.encode_cursor((1,))[:-4]):
+            with self.assertRaises(ValueError):
+                lazy_paginate.decode_cursor(token)
+
+    def test_prefetch_matches(self) -> None:
+        """Test prefetching pages on a worker thread yields the same pages."""
+        self.assertEqual(self.pages(3, key='user_id', prefetch=True),
+                         self.pages(3, key='user_id'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 2-lazy_paginate.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import mysql.connector
+
+from fixtures import create_user_data, import_script
+
+lazy_paginate = import_script('2-lazy_paginate')
+
+
+class FakePool:
+    """
+    Stand-in for MySQLConnectionPool handing out sqlite3 connections and
+    counting how many are checked out.
+    """
+
+    pool_name = 'test'
+
+    def __init__(self, database: str, pool_size: int) -> None:
+        self.database = database
+        self.pool_size = pool_size
+        self.checked_out = self.most_checked_out = 0
+        self._lock = threading.Lock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Open a connection that is counted until it is closed."""
+        pool = self
+
+        class Pooled(sqlite3.Connection):
+            def close(self) -> None:
+                super().close()
+                with pool._lock:
+                    pool.checked_out -= 1
+
+        with self._lock:
+            if self.checked_out == self.pool_size:
+                raise mysql.connector.errors.PoolError("Failed getting connection; pool exhausted")
+            self.checked_out += 1
+            self.most_checked_out = max(self.most_checked_out, self.checked_out)
+        return sqlite3.connect(self.database, factory=Pooled, check_same_thread=False)
+
+
+class TestLazyPaginate(unittest.TestCase):
+    """
+    Test class for 2-lazy_paginate.lazy_paginate with the shared pool.
+    """
+
+    def setUp(self) -> None:
+        """Point the module at a one-connection pool over ten users."""
+        self.tmp = tempfile.TemporaryDirectory()
+        database = os.path.join(self.tmp.name, 'users.db')
+        create_user_data(database)
+        self.pool = FakePool(database, pool_size=1)
+        for name, value in (('_pool', self.pool),
+                            ('_pool_slots', threading.BoundedSemaphore(1))):
+            patcher = patch.object(lazy_paginate, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def test_open_generators_hold_no_connection(self) -> None:
+        """Test more open generators than pooled connections can interleave."""
+        scans = [lazy_paginate.lazy_paginate(3, key='user_id') for _ in range(3)]
+        pages = [[len(page) for page in pages] for pages in zip(*scans)]
+        self.assertEqual(pages, [[3, 3, 3]] * 3 + [[1, 1, 1]])
+        self.assertEqual(self.pool.most_checked_out, 1)
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_offset_pages_use_pool(self) -> None:
+        """Test LIMIT/OFFSET pages also return their connection."""
+        pages = list(lazy_paginate.lazy_paginate(4))
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_prefetch_returns_connection_on_close(self) -> None:
+        """Test closing a prefetching generator early returns its connection."""
+        scan = lazy_paginate.lazy_paginate(2, key='user_id', prefetch=True)
+        next(scan)
+        scan.close()
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_exhausted_pool_times_out(self) -> None:
+        """Test a checkout waits for a free connection and then raises PoolError."""
+        with lazy_paginate.pooled_connection():
+            with self.assertRaises(mysql.connector.errors.PoolError):
+                with lazy_paginate.pooled_connection(timeout=0.05):
+                    pass
+        with lazy_paginate.pooled_connection(timeout=0.05) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM user_data").fetchone(), (10,))
+
+    def test_waits_for_returned_connection(self) -> None:
+        """Test a waiting checkout succeeds once the connection comes back."""
+        held = lazy_paginate.pooled_connection()
+        held.__enter__()
+        threading.Timer(0.05, held.__exit__, (None, None, None)).start()
+        page = next(lazy_paginate.lazy_paginate(5, key='user_id'))
+        self.assertEqual(len(page), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
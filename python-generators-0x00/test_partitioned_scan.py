@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for partitioned_scan.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import partitioned_scan
+from fixtures import create_user_data
+
+
+class TestPartitionedScan(unittest.TestCase):
+    """
+    Test class for partitioned_scan.partitioned_scan and partitioned_age_stats.
+    """
+
+    def setUp(self) -> None:
+        """Create 200 users."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_user_data(self.database, rows=200)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection usable from a partition's thread."""
+        return sqlite3.connect(self.database, check_same_thread=False)
+
+    def failing_connect(self):
+        """
+        A connect for partitioned_scan whose last partition fails; the
+        others only start reading once it has.
+        """
+        failed = threading.Event()
+        calls = []
+        lock = threading.Lock()
+
+        def connect():
+            with lock:
+                calls.append(None)
+                last = len(calls) == 4
+            if last:
+                failed.set()
+                raise OSError("partition down")
+            failed.wait(5)
+            time.sleep(0.05)
+            return self.connect()
+        return connect
+
+    def test_key_ranges_cover_key_space(self) -> None:
+        """Test the ranges are contiguous and unbounded at both ends."""
+        ranges = partitioned_scan.key_ranges(4)
+        self.assertEqual(ranges, [(None, '40000000'), ('40000000', '80000000'),
+                                  ('80000000', 'c0000000'), ('c0000000', None)])
+        with self.assertRaises(ValueError):
+            partitioned_scan.key_ranges(0)
+
+    def test_scan_reads_every_row(self) -> None:
+        """Test both modes read every row once; ordered keeps user_id order."""
+        unordered = list(partitioned_scan.partitioned_scan(self.connect, chunk_size=7))
+        ordered = list(partitioned_scan.partitioned_scan(self.connect, ordered=True,
+                                                         chunk_size=7))
+        ids = [row['user_id'] for row in ordered]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(sorted(row['user_id'] for row in unordered), ids)
+        self.assertEqual(len(ids), 200)
+
+    def test_failure_raised_before_other_partitions_finish(self) -> None:
+        """Test a failing partition stops the scan instead of waiting for the rest."""
+        for ordered in (False, True):
+            rows = []
+            with self.assertRaises(OSError):
+                for row in partitioned_scan.partitioned_scan(
+                        self.failing_connect(), ordered=ordered, chunk_size=5, buffer=1):
+                    rows.append(row)
+            self.assertLessEqual(len(rows), 5)
+
+    def test_age_stats_match_streaming(self) -> None:
+        """Test SQL pushdown and streamed partitions agree on the statistics."""
+        pushed = partitioned_scan.partitioned_age_stats(self.connect, partitions=3)
+        streamed = partitioned_scan.partitioned_age_stats(self.connect, partitions=3,
+                                                          pushdown=False)
+        self.assertEqual((pushed.count, pushed.min, pushed.max), (200, 20, 219))
+        self.assertAlmostEqual(pushed.average, 119.5)
+        self.assertAlmostEqual(streamed.average, pushed.average)
+
+
+if __name__ == '__main__':
+    unittest.main()
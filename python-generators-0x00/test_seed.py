@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for the bulk loading path of seed.
+"""
+
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock
+
+import seed
+
+
+class TestBulkInsert(unittest.TestCase):
+    """
+    Test class for seed.read_chunks, insert_chunk, load_chunk and
+    bulk_insert_data.
+    """
+
+    def setUp(self) -> None:
+        """Write a five-user CSV and open an empty user_data table."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, 'users.csv')
+        with open(self.csv, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['name', 'email', 'age'])
+            writer.writerows([(f"user{i}", f"user{i}@example.com", 20 + i) for i in range(5)])
+        self.conn = sqlite3.connect(':memory:')
+        with redirect_stdout(io.StringIO()):
+            seed.create_table(self.conn)
+
+    def tearDown(self) -> None:
+        """Close the connection and remove the CSV."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def users(self) -> list:
+        """(name, age) of every stored user."""
+        return self.conn.execute("SELECT name, age FROM user_data ORDER BY name").fetchall()
+
+    def test_read_chunks(self) -> None:
+        """Test the CSV is streamed in chunks with stable derived user ids."""
+        chunks = list(seed.read_chunks(self.csv, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(chunks[0][0], seed.row_values(
+            {'name': 'user0', 'email': 'user0@example.com', 'age': '20'}))
+        with self.assertRaises(ValueError):
+            next(seed.read_chunks(self.csv, chunk_size=0))
+
+    def test_bulk_insert_is_idempotent(self) -> None:
+        """Test loading the same file twice keeps one row per user."""
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(seed.bulk_insert_data(self.conn, self.csv, chunk_size=2), 5)
+            seed.bulk_insert_data(self.conn, self.csv, chunk_size=2)
+        self.assertEqual(len(self.users()), 5)
+
+    def test_on_duplicate_update(self) -> None:
+        """Test on_duplicate='update' overwrites existing rows and 'ignore' keeps them."""
+        row = seed.row_values({'name': 'old', 'email': 'a@example.com', 'age': 30})
+        seed.insert_chunk(self.conn, [row])
+        seed.insert_chunk(self.conn, [row[:1] + ('ignored', row[2], 31)])
+        self.assertEqual(self.users(), [('old', 30)])
+        seed.insert_chunk(self.conn, [row[:1] + ('new', row[2], 32)], on_duplicate='update')
+        self.assertEqual(self.users(), [('new', 32)])
+        with self.assertRaises(ValueError):
+            seed.insert_statement(self.conn, on_duplicate='replace')
+
+    def test_failed_chunk_rolled_back(self) -> None:
+        """Test a chunk that fails part way leaves none of its rows behind."""
+        good = seed.row_values({'name': 'ok', 'email': 'ok@example.com', 'age': 1})
+        with self.assertRaises(sqlite3.IntegrityError):
+            seed.insert_chunk(self.conn, [good, ('id', None, 'x@example.com', 2)],
+                             on_duplicate='update')
+        self.assertEqual(self.users(), [])
+
+    def test_load_data_statement(self) -> None:
+        """Test load_chunk sends LOAD DATA with a temporary CSV it then removes."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        self.assertEqual(seed.load_chunk(connection, [('id', 'n', 'e', 1)], 'update'), 1)
+        statement, (path,) = cursor.execute.call_args[0]
+        self.assertTrue(statement.startswith("LOAD DATA LOCAL INFILE %s REPLACE"))
+        self.assertFalse(os.path.exists(path))
+        connection.commit.assert_called_once_with()
+        with self.assertRaises(ValueError):
+            seed.load_chunk(self.conn, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for seed_pipeline.
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import seed
+import seed_pipeline
+
+
+class TestParallelSeed(unittest.TestCase):
+    """
+    Test class for seed_pipeline.split_ranges, parse_range, Checkpoint and
+    parallel_seed.
+    """
+
+    def setUp(self) -> None:
+        """Write a 300-user CSV and create an empty user_data table."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, 'users.csv')
+        with open(self.csv, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['name', 'email', 'age'])
+            writer.writerows([(f"user {i}", f"user{i}@example.com", 20 + i % 50)
+                              for i in range(300)])
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        self.checkpoint = os.path.join(self.tmp.name, 'seed.checkpoint.json')
+        conn = self.connect()
+        with redirect_stdout(io.StringIO()):
+            seed.create_table(conn)
+        conn.close()
+
+    def tearDown(self) -> None:
+        """Remove the files."""
+        self.tmp.cleanup()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection for a writer thread."""
+        return sqlite3.connect(self.database, timeout=30)
+
+    def count(self) -> int:
+        """Number of stored users."""
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM user_data").fetchone()[0]
+        finally:
+            conn.close()
+
+    def seed(self, **options) -> int:
+        """Run parallel_seed quietly with small chunks."""
+        with redirect_stdout(io.StringIO()):
+            return seed_pipeline.parallel_seed(self.connect, self.csv, workers=2, writers=2,
+                                               chunk_bytes=500, **options)
+
+    def test_ranges_parse_every_line_once(self) -> None:
+        """Test byte ranges that split lines still parse each row exactly once."""
+        for chunk_bytes in (1, 37, 500, 1 << 20):
+            fields, ranges = seed_pipeline.split_ranges(self.csv, chunk_bytes)
+            rows = [row for start, end in ranges
+                    for row in seed_pipeline.parse_range(self.csv, fields, start, end)[0]]
+            self.assertEqual([row[1] for row in rows], [f"user {i}" for i in range(300)])
+
+    def test_parallel_seed(self) -> None:
+        """Test every row is inserted and a finished run removes its checkpoint."""
+        self.assertEqual(self.seed(checkpoint_path=self.checkpoint), 300)
+        self.assertEqual(self.count(), 300)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_skips_committed_chunks(self) -> None:
+        """Test chunks recorded in the checkpoint are not loaded again."""
+        checkpoint = seed_pipeline.Checkpoint(self.checkpoint, self.csv, 500)
+        checkpoint.mark(0)
+        checkpoint.mark(1)
+        fields, ranges = seed_pipeline.split_ranges(self.csv, 500)
+        skipped = sum(len(seed_pipeline.parse_range(self.csv, fields, *ranges[i])[0])
+                      for i in (0, 1))
+        self.assertEqual(self.seed(checkpoint_path=self.checkpoint), 300 - skipped)
+
+    def test_stale_checkpoint_ignored(self) -> None:
+        """Test a checkpoint written for another chunk size is not applied."""
+        with open(self.checkpoint, 'w', encoding='utf-8') as file:
+            json.dump({'key': {'file': self.csv, 'chunk_bytes': 64}, 'done': [0, 1, 2]}, file)
+        self.assertEqual(self.seed(checkpoint_path=self.checkpoint), 300)
+
+    def test_writer_failure_raised(self) -> None:
+        """Test a writer that can't connect fails the run."""
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(ConnectionError):
+                seed_pipeline.parallel_seed(lambda: None, self.csv, workers=1, writers=1,
+                                            chunk_bytes=500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for the aggregates in 4-stream_ages.
+"""
+
+import io
+import random
+import sqlite3
+import statistics
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import import_script, user_rows
+
+stream_ages = import_script('4-stream_ages')
+
+
+class TestAggregateAges(unittest.TestCase):
+    """
+    Test class for 4-stream_ages.aggregate_ages, RunningStats and
+    QuantileSketch.
+    """
+
+    def setUp(self) -> None:
+        """Ten users aged 20 to 29."""
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE user_data (user_id TEXT, name TEXT, email TEXT, "
+                          "age INTEGER)")
+        self.conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", user_rows(10))
+
+    def tearDown(self) -> None:
+        """Close the connection."""
+        self.conn.close()
+
+    def test_pushdown_matches_streaming(self) -> None:
+        """Test SQL and streamed aggregates agree, in total and per bucket."""
+        for bucket_size in (None, 5):
+            pushed = stream_ages.aggregate_ages(self.conn, bucket_size)
+            streamed = stream_ages.aggregate_ages(self.conn, bucket_size, pushdown=False,
+                                                  chunk_size=3)
+            for pushed_row, streamed_row in zip(
+                    pushed if bucket_size else [pushed], streamed if bucket_size else [streamed]):
+                for key in ('count', 'sum', 'min', 'max', 'avg'):
+                    self.assertEqual(pushed_row[key], streamed_row[key])
+        self.assertEqual([row['bucket'] for row in streamed], [20, 25])
+
+    def test_percentiles_stream(self) -> None:
+        """Test asking for percentiles streams and adds variance."""
+        result = stream_ages.aggregate_ages(self.conn, percentiles=(0.5, 0.9))
+        self.assertEqual(result['variance'], 8.25)
+        self.assertEqual(result['percentiles'], {0.5: 24.5, 0.9: 28.5})
+
+    def test_calculate_average_age(self) -> None:
+        """Test the average is printed and returned."""
+        with redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(stream_ages.calculate_average_age(connection=self.conn), 24.5)
+        self.assertIn("24.50", out.getvalue())
+
+    def test_running_stats_merge(self) -> None:
+        """Test merged partial statistics match one pass over all values."""
+        values = [random.gauss(40, 12) for _ in range(1000)]
+        merged = stream_ages.RunningStats().update(values[:300]).merge(
+            stream_ages.RunningStats().update(values[300:]))
+        self.assertAlmostEqual(merged.variance, statistics.pvariance(values))
+        self.assertEqual((merged.min, merged.max), (min(values), max(values)))
+
+    def test_quantile_sketch_accuracy(self) -> None:
+        """Test sketch quantiles land within about 1% rank of the exact ones."""
+        values = [random.expovariate(1) for _ in range(20000)]
+        sketch = stream_ages.QuantileSketch().update(values[:10000]).merge(
+            stream_ages.QuantileSketch().update(values[10000:]))
+        ordered = sorted(values)
+        for q in (0.01, 0.5, 0.99):
+            rank = sum(value <= sketch.quantile(q) for value in ordered) / len(ordered)
+            self.assertAlmostEqual(rank, q, delta=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for stream_pipeline.
+"""
+
+import sqlite3
+import unittest
+
+from fixtures import user_rows
+from stream_pipeline import (Aggregate, Avg, Count, Max, Min, Stream, Sum,
+                             where)
+
+
+class TestStream(unittest.TestCase):
+    """
+    Test class for stream_pipeline.Stream over a table and over rows.
+    """
+
+    def setUp(self) -> None:
+        """Create ten users in memory, one of them without an age."""
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE user_data (user_id TEXT, name TEXT, "
+                          "email TEXT, age INTEGER)")
+        self.conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", user_rows(10))
+        self.conn.execute("UPDATE user_data SET age = NULL WHERE name = 'user9'")
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+        self.rows = [dict(zip(('user_id', 'name', 'email', 'age'), row))
+                     for row in self.conn.execute("SELECT * FROM user_data")]
+
+    def tearDown(self) -> None:
+        """Close the connection."""
+        self.conn.close()
+
+    def both(self, build) -> list:
+        """Run one chain on the table and on plain rows; they must agree."""
+        table = list(build(Stream.from_table(self.conn)))
+        self.assertEqual(table, list(build(Stream.from_rows(self.rows))))
+        return table
+
+    def test_pushdown(self) -> None:
+        """Test filter, project and take before Python steps become SQL."""
+        rows = self.both(lambda s: s.filter(where('age', '>=', 25)).project('name').take(2))
+        self.assertEqual(rows, [{'name': 'user5'}, {'name': 'user6'}])
+        self.assertEqual(self.statements[-1],
+                         "SELECT name FROM user_data WHERE age >= 25 LIMIT 2")
+
+    def test_filter_on_projected_away_column(self) -> None:
+        """Test filtering on a dropped column fails on tables and rows alike."""
+        for stream in (Stream.from_table(self.conn), Stream.from_rows(self.rows)):
+            with self.assertRaises(KeyError):
+                list(stream.project('name').filter(where('age', '>', 25)))
+
+    def test_filter_on_projected_column_pushed_down(self) -> None:
+        """Test a filter on a column the projection keeps still goes to SQL."""
+        rows = self.both(lambda s: s.project('name', 'age').filter(where('age', '<', 21)))
+        self.assertEqual(rows, [{'name': 'user0', 'age': 20}])
+        self.assertEqual(self.statements[-1],
+                         "SELECT name, age FROM user_data WHERE age < 21")
+
+    def test_none_is_null(self) -> None:
+        """Test comparing with None means IS NULL / IS NOT NULL."""
+        self.assertEqual(self.both(lambda s: s.filter(where('age', '==', None)).project('name')),
+                         [{'name': 'user9'}])
+        self.assertEqual(len(self.both(lambda s: s.filter(where('age', '!=', None)))), 9)
+        self.assertEqual(len(self.both(lambda s: s.filter(where('age', '>', 0)))), 9)
+        with self.assertRaises(ValueError):
+            where('age', '>', None)
+
+    def test_aggregate_and_group_by(self) -> None:
+        """Test aggregates over a stream of batches and per group."""
+        batches = [self.rows[:4], self.rows[4:9]]
+        self.assertEqual(Stream.from_batches(batches).aggregate(
+            n=Count(), total=Sum('age'), avg=Avg('age'), low=Min('age'), high=Max('age')),
+            {'n': 9, 'total': 216, 'avg': 24.0, 'low': 20, 'high': 28})
+        groups = list(Stream.from_rows(self.rows[:9]).group_by(
+            lambda row: row['age'] % 2, n=Count()))
+        self.assertEqual(groups, [{'key': 0, 'n': 5}, {'key': 1, 'n': 4}])
+
+    def test_aggregate_is_abstract(self) -> None:
+        """Test an Aggregate without add() can't be instantiated."""
+        with self.assertRaises(TypeError):
+            Aggregate()
+
+
+if __name__ == '__main__':
+    unittest.main()
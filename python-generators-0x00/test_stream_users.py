@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Module that contains unit tests for 0-stream_users.stream_users.
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fixtures import create_user_data, import_script
+
+stream_users_module = import_script('0-stream_users')
+stream_users = stream_users_module.stream_users
+
+
+class TestStreamUsers(unittest.TestCase):
+    """
+    Test class for 0-stream_users.stream_users.
+    """
+
+    def setUp(self) -> None:
+        """Create ten users."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'users.db')
+        create_user_data(self.database)
+
+    def tearDown(self) -> None:
+        """Remove the database."""
+        self.tmp.cleanup()
+
+    def test_default_and_prefetch_agree(self) -> None:
+        """Test both cursor modes yield the same dict rows."""
+        conn = sqlite3.connect(self.database)
+        self.addCleanup(conn.close)
+        rows = list(stream_users(connection=conn))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(set(rows[0]), {'user_id', 'name', 'email', 'age'})
+        self.assertEqual(list(stream_users(prefetch=3, connection=conn)), rows)
+
+    def test_invalid_prefetch(self) -> None:
+        """Test prefetch must be a positive integer."""
+        for prefetch in (0, -1, 2.5):
+            with self.assertRaises(ValueError):
+                next(stream_users(prefetch=prefetch))
+
+    def test_prefetch_streams_unbuffered(self) -> None:
+        """Test MySQL rows are read from an unbuffered cursor prefetch at a time."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value
+        cursor.fetchmany.side_effect = [[{'user_id': 1}, {'user_id': 2}], [{'user_id': 3}], []]
+        rows = list(stream_users(prefetch=2, connection=connection))
+        self.assertEqual([row['user_id'] for row in rows], [1, 2, 3])
+        connection.cursor.assert_called_once_with(dictionary=True, buffered=False)
+        cursor.fetchmany.assert_called_with(2)
+        connection.close.assert_not_called()
+
+    def test_own_connection_closed_when_abandoned(self) -> None:
+        """Test stopping early closes the cursor and the connection it opened."""
+        conn = MagicMock(wraps=sqlite3.connect(self.database))
+        with patch.object(stream_users_module, 'connect', return_value=conn), \
+                patch.object(stream_users_module.seed, 'is_sqlite', return_value=True):
+            stream = stream_users(prefetch=2)
+            next(stream)
+            stream.close()
+        conn.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()